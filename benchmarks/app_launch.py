@@ -0,0 +1,99 @@
+#!../.venv/bin/python3
+
+# Check launching and pooling of external apps against UIFakeWindowManager, no X display or apps needed.
+# Run from the repository root: python3 benchmarks/app_launch.py
+
+import contextlib
+import os
+import sys
+import time
+
+import pyglet
+# fonts need a GL context, use EGL when there is no X display
+pyglet.options["headless"] = "DISPLAY" not in os.environ
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import demo
+from demo import UIAppLaunch, UIAppPolicy, UIAppPool, UIFakeWindowManager
+
+# searches before a spawned app shows its window
+SEARCHES = 4
+FRAME = (100, 50, 800, 600)
+
+
+class TimedWindowManager(UIFakeWindowManager):
+
+	# times of searches, for checking backoff
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.search_times = []
+
+	def search(self, name) -> list[str]:
+		self.search_times.append(time.monotonic())
+		return super().search(name)
+
+
+def run_until(done: callable, seconds=10.0):
+	# clock callbacks run like in application loop, window worker results come back through them
+	end = time.monotonic() + seconds
+	while not done() and time.monotonic() < end:
+		pyglet.clock.tick()
+		time.sleep(0.005)
+	assert done(), "timed out waiting"
+
+
+def check_backoff():
+	# window open before launch is not ours, new one is found after searches backing off
+	manager = demo.window_manager = TimedWindowManager({"mail": "Mail"}, searches=SEARCHES)
+	manager.windows["99"] = {"title": "Mail", "x": 0, "y": 0, "width": 0, "height": 0, "mapped": True}
+	found = []
+	UIAppLaunch(["mail"], "Mail", found.append)
+	run_until(lambda: found)
+	assert found == [["1"]], f"existing window was taken for launched app: {found}"
+	# first search only lists existing windows, the rest are polls
+	gaps = [b - a for a, b in zip(manager.search_times[1:], manager.search_times[2:])]
+	assert len(manager.search_times) == SEARCHES + 1, manager.search_times
+	assert all(later > earlier * 1.5 for earlier, later in zip(gaps, gaps[1:])), f"searches don't back off: {gaps}"
+
+
+def check_place():
+	# window of app shown while it starts up is placed in its frame
+	manager = demo.window_manager = UIFakeWindowManager({"mail": "Mail"}, searches=2)
+	pool = UIAppPool(1 << 30)
+	pool.register(UIAppPolicy("Mail", ["mail"]))
+	pool.show("Mail", FRAME)
+	app = pool.apps["Mail"]
+	run_until(lambda: ("place", "1") in manager.calls)
+	window = manager.windows["1"]
+	assert app.ids == ["1"] and (window["x"], window["y"], window["width"], window["height"]) == FRAME, window
+
+
+def check_timeout():
+	# app whose window never shows up is given up on and stopped
+	manager = demo.window_manager = UIFakeWindowManager({"mail": "Other"})
+	found, timeouts = [], []
+	launch = UIAppLaunch(["mail"], "Mail", found.append, lambda: timeouts.append(True))
+	launch.timeout = 0.5
+	run_until(lambda: timeouts)
+	assert not found and ("spawn", "mail") in manager.calls
+
+	pool = UIAppPool(1 << 30)
+	pool.register(UIAppPolicy("Mail", ["mail"]))
+	UIAppLaunch.timeout, timeout = 0.5, UIAppLaunch.timeout
+	try:
+		pool.show("Mail", FRAME)
+		app = pool.apps["Mail"]
+		run_until(lambda: app.launch is None)
+		run_until(lambda: ("terminate", "mail") in manager.calls)
+		assert app.not_launched and app.process is None
+	finally:
+		UIAppLaunch.timeout = timeout
+
+
+if __name__ == "__main__":
+	with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+		check_backoff()
+		check_place()
+		check_timeout()
+	print("app launch ok")
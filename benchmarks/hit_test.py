@@ -0,0 +1,87 @@
+#!../.venv/bin/python3
+
+# Dispatch clicks against 10k views through UIHitGrid and compare with linear scan.
+# Run from the repository root: python3 benchmarks/hit_test.py
+
+import os
+import random
+import sys
+import time
+
+import pyglet
+# fonts need a GL context, use EGL when there is no X display
+pyglet.options["headless"] = "DISPLAY" not in os.environ
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from demo import UIButton, UIView, UIText, UIHitGrid, UIEvent, arisotelica_font
+
+COLUMNS = 100
+ROWS = 100
+CLICKS = 100_000
+
+
+def build():
+	root = UIView(0, 0, 1920, 1080)
+	presses = []
+	for column in range(COLUMNS):
+		for row in range(ROWS):
+			# every cell is a button with a label over it, like the main screen cards
+			button = UIButton(column * 19, row * 10, 18, 9)
+			button.add_target(action=presses.append, event=UIEvent.press, arg=(column, row))
+			button.add_subview(UIText(0, 0, 18, 9, font=arisotelica_font, font_size=8, text="x"))
+			root.add_subview(button)
+	return root, presses
+
+
+def index(root: UIView):
+	grid = UIHitGrid()
+	views = []
+	stack = [root]
+	while stack:
+		view = stack.pop()
+		views.append(view)
+		stack.extend(reversed(view.subviews))
+	for z, view in enumerate(views):
+		if view.user_interaction_enabled:
+			grid.update(view, (view.x, view.y, view.x + view.width, view.y + view.height), z)
+	return grid, views
+
+
+def linear_hit(views: list[UIView], x, y):
+	for view in reversed(views):
+		if view.user_interaction_enabled and view.x <= x <= view.x + view.width and view.y <= y <= view.y + view.height:
+			return view
+
+
+if __name__ == "__main__":
+	root, presses = build()
+
+	start = time.perf_counter()
+	grid, views = index(root)
+	print(f"index {len(grid.rects)} responders: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+	random.seed(0)
+	points = [(random.uniform(0, 1920), random.uniform(0, 1080)) for _ in range(CLICKS)]
+
+	start = time.perf_counter()
+	for x, y in points:
+		view = grid.hit(x, y)
+		if view is not None:
+			view.mouse_down(view.arg)
+	grid_time = time.perf_counter() - start
+	print(f"grid: {grid_time / CLICKS * 1e6:.2f} us per click, {len(presses)} presses")
+
+	clicks = CLICKS // 100
+	start = time.perf_counter()
+	for x, y in points[:clicks]:
+		assert linear_hit(views, x, y) is grid.hit(x, y)
+	linear_time = time.perf_counter() - start
+	print(f"linear: {linear_time / clicks * 1e6:.2f} us per click")
+
+	moved = [view for view in views if view in grid.rects][1:1001]
+	start = time.perf_counter()
+	for view in moved:
+		view.x += 1
+		grid.update(view, (view.x, view.y, view.x + view.width, view.y + view.height), grid.rects[view][4])
+	print(f"move {len(moved)} views: {(time.perf_counter() - start) * 1000:.1f} ms")
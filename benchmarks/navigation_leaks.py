@@ -0,0 +1,69 @@
+#!../.venv/bin/python3
+
+# Navigate between main and functions screens and report memory growth with tracemalloc.
+# Run from the repository root: python3 benchmarks/navigation_leaks.py [navigations]
+
+import contextlib
+import gc
+import os
+import sys
+import tracemalloc
+
+import pyglet
+# fonts need a GL context, use EGL when there is no X display
+pyglet.options["headless"] = "DISPLAY" not in os.environ
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from demo import UIWindow, UIScreen, MainViewController
+
+NAVIGATIONS = 10_000
+WARMUP = 100
+
+
+def navigate(window: UIWindow, count):
+	main = window.navigation_stack[0]
+	for _ in range(count):
+		main.func_app_view.mouse_down(main.func_app_view.arg)
+		window.update(0)
+		window.view_controller.back_button.mouse_down(None)
+		window.update(0)
+		# let unscheduled updates expire and queued window events run like they do in application loop
+		pyglet.clock.tick()
+		window.canvas.dispatch_events()
+
+
+def check_repush(window: UIWindow):
+	# screen opened again after going back ticks its clock like when it was first opened
+	main = window.navigation_stack[0]
+	for _ in range(2):
+		main.func_app_view.mouse_down(main.func_app_view.arg)
+		window.update(0)
+		assert not window.view_controller.released, "released screen is shown again"
+		assert window.view_controller.clock_timer is not None, "clock of screen opened again is stopped"
+		window.view_controller.back_button.mouse_down(None)
+		window.update(0)
+		assert main.clock_timer is not None, "clock of screen gone back to is stopped"
+
+
+if __name__ == "__main__":
+	navigations = int(sys.argv[1]) if len(sys.argv) > 1 else NAVIGATIONS
+	window = UIWindow(view_controller=MainViewController, width=1920, height=1080, title="navigation", screen=UIScreen(0, 0, 1920, 1080))
+	window.create()
+	window.update(0)
+
+	with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+		check_repush(window)
+		navigate(window, WARMUP)
+		tracemalloc.start()
+		gc.collect()
+		before = tracemalloc.take_snapshot()
+		navigate(window, navigations)
+		gc.collect()
+		after = tracemalloc.take_snapshot()
+
+	stats = after.compare_to(before, "lineno")
+	growth = sum(stat.size_diff for stat in stats)
+	print(f"{navigations} navigations: {growth / 1024:+.1f} KiB, {growth / navigations:+.1f} B per navigation")
+	for stat in stats[:10]:
+		print(stat)
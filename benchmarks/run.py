@@ -0,0 +1,465 @@
+#!../.venv/bin/python3
+
+# Run headless benchmarks, compare them with benchmarks/baseline.json and flag regressions.
+# Run from the repository root: python3 benchmarks/run.py [--update] [--tolerance 0.25] [--repeat 3] [case ...]
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pyglet
+# fonts need a GL context, use EGL when there is no X display
+pyglet.options["headless"] = "DISPLAY" not in os.environ
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_PATH))
+sys.path.insert(0, BENCHMARKS_PATH)
+
+from demo import UIWindow, UIScreen, UIViewController, UIView, UIText, UIImage, UIButton, UIColor, UIListView, UITextInput, UIViewStore, UIGLRenderer, UIRecordingRenderer, MainViewController, arisotelica_font, animator, image_cache, RESOURCES_PATH
+import hit_test
+import navigation_leaks
+
+BASELINE_PATH = os.path.join(BENCHMARKS_PATH, "baseline.json")
+SCENE_SIZE = 1000
+FRAMES = 60
+NAVIGATIONS = 50
+CLICKS = 20_000
+STARTUPS = 3
+REPLAYS = 10
+# back presses from functions to main screen
+BACKS = 20
+# frames redrawing whole main screen, like after expose or a full screen animation
+REDRAWS = 60
+IMAGE_LOADS = 24
+LIST_ROWS = 100_000
+# frames of dragging by a few pixels, and at most frames of coasting after a flick which crosses the whole list
+DRAG_FRAMES = 60
+FLING_FRAMES = 240
+# flick is FLICK_MOVES touch moves FLICK_INTERVAL seconds apart
+FLICK_MOVES = 4
+FLICK_INTERVAL = 0.01
+# views, layout and draw calls of 95% of scrolling frames must fit in a frame at 60 Hz, software GL rasterizing comes on top
+FRAME_BUDGET_MS = 1000 / 60
+# metrics which must stay under a fixed limit, on top of comparing them with baseline
+BUDGETS = {"scroll.cpu_frame_p95_ms": FRAME_BUDGET_MS}
+# paragraphs of wrapped text edited in the middle, like a long document
+TYPING_PARAGRAPHS = 200
+TYPING_KEYS = 30
+# absolute change ignored on top of tolerance, by metric unit which ends its name
+SLACK = {"ms": 0.05, "us": 0.5, "kib": 1.0}
+# metrics measured once per run instead of as median of many frames, compared with wider tolerance
+SINGLE_SHOT = ("first_frame_ms", "max_ms", "loaded_ms", "startup.")
+
+# last line printed is JSON of seconds, phases come from demo.startup_trace
+STARTUP = """
+import time
+start = time.perf_counter()
+import json
+import pyglet
+pyglet.options["headless"] = {headless}
+import demo
+imported = time.perf_counter()
+window = demo.UIWindow(view_controller=demo.MainViewController, width=1920, height=1080, title="startup", screen=demo.UIScreen(0, 0, 1920, 1080))
+window.create()
+window.update(0)
+pyglet.gl.glFinish()
+print(json.dumps({{"import": imported - start, "first_frame": time.perf_counter() - start, **demo.startup_trace.phases}}))
+"""
+# startup trace phases reported with import and first frame
+STARTUP_PHASES = ["fonts", "controllers", "window", "frame"]
+
+
+class SceneViewController(UIViewController):
+
+	def __init__(self, scene: list[UIView]):
+		super().__init__()
+		self.scene = scene
+
+	def view_did_load(self):
+		for view in self.scene:
+			self.view.add_subview(view)
+
+
+def frame(window: UIWindow):
+	window.update(0)
+	# llvmpipe renders when commands are flushed, count it in frame
+	pyglet.gl.glFinish()
+	# expire unscheduled updates and run queued window events like application loop does
+	pyglet.clock.tick()
+	window.canvas.dispatch_events()
+
+
+def grid(count):
+	# 100 columns of 18x9 cells, like hit_test
+	return [((i % 100) * 19, (i // 100) * 10) for i in range(count)]
+
+
+def scene_case(make, mutate, compact=False):
+	# first frame builds retained state of the whole scene, next frames change a tenth of views each
+	# compact scene is made of views of one UIViewStore, make gets the store first
+	def case(window: UIWindow):
+		if compact:
+			store = UIViewStore(0, 0, 1920, 1080)
+			scene = [make(store, x, y) for x, y in grid(SCENE_SIZE)]
+			subviews = [store]
+		else:
+			scene = subviews = [make(x, y) for x, y in grid(SCENE_SIZE)]
+		start = time.perf_counter()
+		window.push(SceneViewController(subviews))
+		frame(window)
+		first_frame = time.perf_counter() - start
+
+		times = []
+		for i in range(FRAMES):
+			for view in scene[i % 10::10]:
+				mutate(view, i // 10 % 2)
+			start = time.perf_counter()
+			frame(window)
+			times.append(time.perf_counter() - start)
+
+		# blocks allocated before tracing are not seen when freed, count growth after a traced pass
+		tracemalloc.start()
+		for _ in range(2):
+			start_size = tracemalloc.get_traced_memory()[0]
+			tracemalloc.reset_peak()
+			for i in range(FRAMES):
+				for view in scene[i % 10::10]:
+					mutate(view, i // 10 % 2)
+				frame(window)
+			current, peak = tracemalloc.get_traced_memory()
+		tracemalloc.stop()
+
+		window.pop()
+		frame(window)
+		return {
+			"first_frame_ms": first_frame * 1000,
+			"frame_ms": statistics.median(times) * 1000,
+			"frame_peak_kib": (peak - start_size) / 1024,
+			"retained_per_frame_kib": (current - start_size) / FRAMES / 1024,
+		}
+	return case
+
+
+colors = [UIColor("ABABAB"), UIColor("525252")]
+
+def set_background(view: UIView, flip):
+	view.background_color = colors[flip]
+
+def set_text_color(view: UIText, flip):
+	view.text_color = colors[flip]
+
+def set_opacity(view: UIImage, flip):
+	view.opacity = 50 if flip else 100
+
+def set_stroke(view: UIButton, flip):
+	view.stroke_color = colors[flip]
+
+
+def navigation_case(window: UIWindow):
+	main = UIWindow(view_controller=MainViewController, width=1920, height=1080, title="navigation", screen=UIScreen(0, 0, 1920, 1080))
+	main.create()
+	frame(main)
+	navigation_leaks.navigate(main, 10)
+	times = []
+	for _ in range(NAVIGATIONS):
+		start = time.perf_counter()
+		navigation_leaks.navigate(main, 1)
+		pyglet.gl.glFinish()
+		times.append(time.perf_counter() - start)
+	main.canvas.close()
+	return {"round_trip_ms": statistics.median(times) * 1000}
+
+
+def layers_case(window: UIWindow):
+	# chrome and cards are rasterized, full redraws reuse their textures and clock redraws only header
+	main = UIWindow(view_controller=MainViewController, width=1920, height=1080, title="layers", screen=UIScreen(0, 0, 1920, 1080))
+	main.create()
+	frame(main)
+
+	def redraw(change):
+		times = []
+		for i in range(REDRAWS):
+			change(i)
+			start = time.perf_counter()
+			frame(main)
+			times.append(time.perf_counter() - start)
+		return statistics.median(times) * 1000
+
+	controller = main.view_controller
+	results = {
+		"redraw_ms": redraw(lambda i: main.set_needs_display()),
+		"clock_ms": redraw(lambda i: setattr(controller.date_time_text, "text", f"06.08.2024 17:{i:02}")),
+	}
+	main.canvas.close()
+	return results
+
+
+def back_case(window: UIWindow):
+	# main screen is presented from its snapshot in first frame after back press, its views are drawn behind it in next one
+	main = UIWindow(view_controller=MainViewController, width=1920, height=1080, title="back", screen=UIScreen(0, 0, 1920, 1080))
+	main.create()
+	frame(main)
+	controller = main.view_controller
+	backs = []
+	lives = []
+	for _ in range(BACKS):
+		controller.func_app_view.mouse_down(controller.func_app_view.arg)
+		frame(main)
+		frame(main)
+		start = time.perf_counter()
+		main.view_controller.back_button.mouse_down(None)
+		frame(main)
+		backs.append(time.perf_counter() - start)
+		start = time.perf_counter()
+		frame(main)
+		lives.append(time.perf_counter() - start)
+	main.canvas.close()
+	return {"back_ms": statistics.median(backs) * 1000, "live_ms": statistics.median(lives) * 1000}
+
+
+def replay_case(window: UIWindow):
+	# record navigation session once, then time drawing its commands without views
+	main = UIWindow(view_controller=MainViewController, width=1920, height=1080, title="replay", screen=UIScreen(0, 0, 1920, 1080))
+	main.create()
+	recorder = main.renderer = UIRecordingRenderer(main.renderer)
+	frame(main)
+	navigation_leaks.navigate(main, 5)
+	main.canvas.close()
+
+	times = []
+	for _ in range(REPLAYS):
+		renderer = UIGLRenderer(window.canvas)
+		start = time.perf_counter()
+		UIRecordingRenderer.replay(recorder.frames, renderer)
+		pyglet.gl.glFinish()
+		times.append(time.perf_counter() - start)
+		for key in list(renderer.groups):
+			renderer.remove(key)
+	return {"session_ms": statistics.median(times) * 1000}
+
+
+def image_loads_case(window: UIWindow):
+	# screen of images which are not cached yet, first frame shows placeholders and images fill in while frames run
+	with tempfile.TemporaryDirectory() as directory:
+		paths = [shutil.copy(f"{RESOURCES_PATH}/images/tmp_block.png", f"{directory}/block_{i}.png") for i in range(IMAGE_LOADS)]
+		scene = [UIImage((i % 3) * 620, (i // 3) * 130, 606, 115, path=path, background_color=colors[0]) for i, path in enumerate(paths)]
+		start = time.perf_counter()
+		window.push(SceneViewController(scene))
+		frame(window)
+		first_frame = time.perf_counter() - start
+		frames = []
+		while image_cache.loading:
+			frame_start = time.perf_counter()
+			frame(window)
+			frames.append(time.perf_counter() - frame_start)
+		frame(window)
+		loaded = time.perf_counter() - start
+		window.pop()
+		frame(window)
+	return {"first_frame_ms": first_frame * 1000, "frame_max_ms": max(frames, default=0) * 1000, "loaded_ms": loaded * 1000}
+
+
+def make_row():
+	row = UIButton(0, 0, 1900, 38, background_color=colors[0], stroke_color=colors[1], stroke_width=1)
+	row.add_subview(UIText(10, 4, 600, 30, font=arisotelica_font, font_size=16, background_color=colors[0]))
+	return row
+
+def configure_row(row: UIButton, index):
+	row.subviews[0].text = f"row {index}"
+
+
+def scroll_case(window: UIWindow):
+	# only rows on screen exist, frame time must not depend on number of rows
+	# list is scrolled by touches like window sends them, flick coasts with UIDecay
+	start = time.perf_counter()
+	rows = UIListView(0, 0, 1920, 1080, count=LIST_ROWS, row_height=38, row_spacing=2, make_row=make_row, configure_row=configure_row, content_inset=10, background_color=colors[0])
+	window.push(SceneViewController([rows]))
+	frame(window)
+	first_frame = time.perf_counter() - start
+	row = rows.rows[0]
+	times = []
+	cpu_times = []
+
+	def timed_frame():
+		# frame which draws nothing keeps cpu time of last drawn one
+		window.cpu_time = 0.0
+		start = time.perf_counter()
+		frame(window)
+		times.append(time.perf_counter() - start)
+		cpu_times.append(window.cpu_time)
+
+	y = 100
+	rows.touch_down(row, 100, y)
+	for _ in range(DRAG_FRAMES):
+		y += 8
+		rows.touch_moved(100, y)
+		timed_frame()
+	# drag ends without coasting
+	rows.touch_up(100, y)
+	animator.cancel(rows, "content_offset")
+	drag = len(times)
+
+	# flick is fast enough to coast past the end of the list, twice the speed that reaches it
+	step = 2 * rows.max_offset() * rows.deceleration * FLICK_INTERVAL
+	rows.touch_down(row, 100, y)
+	for _ in range(FLICK_MOVES):
+		time.sleep(FLICK_INTERVAL)
+		y += step
+		rows.touch_moved(100, y)
+	rows.touch_up(100, y)
+	assert animator.animating(rows, "content_offset"), "flick did not coast"
+	while animator.animating(rows, "content_offset") and len(times) < drag + FLING_FRAMES:
+		timed_frame()
+	assert rows.content_offset == rows.max_offset(), f"fling stopped at {rows.content_offset:.0f} of {rows.max_offset():.0f}"
+	window.pop()
+	frame(window)
+
+	return {
+		"first_frame_ms": first_frame * 1000,
+		"drag_frame_ms": statistics.median(times[:drag]) * 1000,
+		"fling_frame_ms": statistics.median(times[drag:]) * 1000,
+		"frame_max_ms": max(times) * 1000,
+		"cpu_frame_ms": statistics.median(cpu_times) * 1000,
+		"cpu_frame_p95_ms": statistics.quantiles(cpu_times, n=20)[-1] * 1000,
+		"cpu_frame_max_ms": max(cpu_times) * 1000,
+	}
+
+
+def typing_case(window: UIWindow):
+	# a keystroke lays out again only paragraph it changes
+	paragraph = "The quick brown fox jumps over the lazy dog, then naps in the sun. " * 5
+	start = time.perf_counter()
+	text = UITextInput(100, 40, 1200, 1000, font=arisotelica_font, font_size=20, text="\n".join([paragraph] * TYPING_PARAGRAPHS), text_color=colors[1], background_color=colors[0])
+	window.push(SceneViewController([text]))
+	frame(window)
+	first_frame = time.perf_counter() - start
+	window.first_responder = text
+	text.cursor = len(paragraph) * TYPING_PARAGRAPHS // 2
+	times = []
+	for i in range(TYPING_KEYS):
+		start = time.perf_counter()
+		window.canvas.dispatch_event("on_text", "\r" if i % 10 == 9 else "x")
+		frame(window)
+		times.append(time.perf_counter() - start)
+	window.pop()
+	frame(window)
+	return {"first_frame_ms": first_frame * 1000, "keystroke_ms": statistics.median(times) * 1000, "keystroke_max_ms": max(times) * 1000}
+
+
+def hit_test_case(window: UIWindow):
+	root, presses = hit_test.build()
+	start = time.perf_counter()
+	grid, views = hit_test.index(root)
+	index_time = time.perf_counter() - start
+	points = [((i * 7919) % 1920, (i * 104729) % 1080) for i in range(CLICKS)]
+	start = time.perf_counter()
+	for x, y in points:
+		grid.hit(x, y)
+	return {"index_ms": index_time * 1000, "hit_us": (time.perf_counter() - start) / CLICKS * 1e6}
+
+
+def startup_case(window: UIWindow):
+	runs = []
+	script = STARTUP.format(headless=pyglet.options["headless"])
+	for _ in range(STARTUPS):
+		result = subprocess.run([sys.executable, "-c", script], stdout=subprocess.PIPE, text=True, check=True)
+		runs.append(json.loads(result.stdout.splitlines()[-1]))
+	return {f"{name}_ms": statistics.median(run.get(name, 0.0) for run in runs) * 1000 for name in ["import", "first_frame", *STARTUP_PHASES]}
+
+
+CASES = {
+	"views": scene_case(lambda x, y: UIView(x, y, 18, 9, background_color=colors[0]), set_background),
+	"texts": scene_case(lambda x, y: UIText(x, y, 18, 9, font=arisotelica_font, font_size=8, text="x", background_color=colors[0]), set_text_color),
+	"images": scene_case(lambda x, y: UIImage(x, y, 18, 9, path=f"{RESOURCES_PATH}/images/mail_icon.png"), set_opacity),
+	"buttons": scene_case(lambda x, y: UIButton(x, y, 18, 9, background_color=colors[0], stroke_color=colors[1], stroke_width=1), set_stroke),
+	"compact": scene_case(lambda store, x, y: store.add_view(x, y, 18, 9, background_color=colors[0], stroke_color=colors[1], stroke_width=1), set_stroke, compact=True),
+	"navigation": navigation_case,
+	"replay": replay_case,
+	"layers": layers_case,
+	"back": back_case,
+	"image_loads": image_loads_case,
+	"scroll": scroll_case,
+	"typing": typing_case,
+	"hit_test": hit_test_case,
+	"startup": startup_case,
+}
+
+
+def machine():
+	return f"{platform.node()} {platform.machine()} python {platform.python_version()} pyglet {pyglet.version}"
+
+
+def compare(results: dict, baseline: dict, tolerance, single_shot_tolerance):
+	regressions = []
+	for name, value in results.items():
+		base = baseline.get(name)
+		allowed = single_shot_tolerance if name.startswith(SINGLE_SHOT) or name.endswith(SINGLE_SHOT) else tolerance
+		if base is None:
+			status = "new"
+		elif value > base * (1 + allowed) + SLACK[name.rsplit("_", 1)[-1]]:
+			status = "REGRESSION"
+			regressions.append(name)
+		else:
+			status = "ok"
+		change = "" if base is None else f"{(value - base) / base * 100 if base else 0:+.0f}%"
+		print(f"{name:40} {value:12.3f} {'' if base is None else f'{base:12.3f}':>12} {change:>7}  {status}")
+	return regressions
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("cases", nargs="*", help=f"cases to run, all by default: {', '.join(CASES)}")
+	parser.add_argument("--update", action="store_true", help="write results as new baseline")
+	parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+	parser.add_argument("--single-shot-tolerance", type=float, default=1.0, help="allowed relative slowdown of metrics measured once per run, like first frames and startup")
+	parser.add_argument("--repeat", type=int, default=3, help="runs of each case, lowest value of each metric is compared")
+	args = parser.parse_args()
+	for name in args.cases:
+		if name not in CASES:
+			parser.error(f"unknown case {name}")
+
+	results = {}
+	with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+		window = UIWindow(view_controller=UIViewController, width=1920, height=1080, title="benchmarks", screen=UIScreen(0, 0, 1920, 1080))
+		window.create()
+		frame(window)
+		for name in args.cases or CASES:
+			# lowest value is the one least disturbed by other processes and collections
+			for _ in range(args.repeat):
+				for metric, value in CASES[name](window).items():
+					key = f"{name}.{metric}"
+					results[key] = min(value, results.get(key, value))
+
+	baseline = {}
+	if os.path.exists(BASELINE_PATH):
+		with open(BASELINE_PATH) as f:
+			saved = json.load(f)
+		baseline = saved["metrics"]
+		if saved["machine"] != machine():
+			print(f"baseline is from {saved['machine']}, timings may not compare")
+
+	print(f"{'metric':40} {'value':>12} {'baseline':>12} {'change':>7}")
+	regressions = compare(results, baseline, args.tolerance, args.single_shot_tolerance)
+	over_budget = [name for name, budget in BUDGETS.items() if results.get(name, 0) > budget]
+	for name in over_budget:
+		print(f"{name} is {results[name]:.1f}, over budget of {BUDGETS[name]:.1f}")
+
+	if args.update:
+		with open(BASELINE_PATH, "w") as f:
+			json.dump({"machine": machine(), "metrics": {**baseline, **results}}, f, indent="\t", sort_keys=True)
+			f.write("\n")
+		print(f"baseline written to {BASELINE_PATH}")
+	elif regressions:
+		print(f"{len(regressions)} regressions")
+		sys.exit(1)
+	if over_budget:
+		sys.exit(1)
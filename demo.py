@@ -3,13 +3,49 @@
 from __future__ import annotations
 from enum import Enum
 
+import time
+# startup trace counts from here, pyglet import included
+STARTUP_TIME = time.perf_counter()
+
 import pyglet
 import os
-import time
+import io
+import re
+import sys
+import mmap
+import struct
+import string
+import math
+import array
+import operator
+import ctypes
 import glob
+import json
+import atexit
+import weakref
+import contextlib
+import itertools
+import functools
 import subprocess
-
-RESOURCES_PATH = "./resources"
+import concurrent.futures
+from collections import OrderedDict, deque
+
+# directory of demo.py, or of ./build/demo binary which has no source file
+APP_PATH = os.path.dirname(os.path.abspath(__file__ if os.path.isfile(__file__) else sys.executable))
+# resources are next to demo.py, or one directory up from the binary
+RESOURCES_PATH = next((path for path in (f"{APP_PATH}/resources", f"{os.path.dirname(APP_PATH)}/resources") if os.path.isdir(path)), "./resources")
+# written by make demo next to the binary, served in place of loose files under RESOURCES_PATH when present
+BUNDLE_PATH = f"{APP_PATH}/resources.bundle"
+# bytes of texture memory kept by UIImageCache for images which are not on screen
+IMAGE_CACHE_BUDGET = 64 * 1024 * 1024
+# resident memory of pooled external apps, hidden ones are closed least recently used first above it
+APP_POOL_MEMORY_BUDGET = 1024 * 1024 * 1024
+# non empty shows frame stats over windows, a .json path also gets a Chrome trace written on exit
+UI_PROFILE = os.environ.get("UI_PROFILE", "")
+# non empty tints rasterized views, red in frames their texture is redrawn and green when it is reused
+UI_DEBUG_LAYERS = os.environ.get("UI_DEBUG_LAYERS", "")
+# non empty starts pooled apps whose policy asks for it at boot, otherwise apps start when they are first shown
+UI_PRELAUNCH = os.environ.get("UI_PRELAUNCH", "")
 
 # TODO: draw shapes with OpenGL POINTS UIBezeithPath
 
@@ -33,6 +69,11 @@ class UIColor:
 	def get_rgba(self, opacity):
 		return self.rgba if opacity == 100 else (self.r, self.g, self.b, round(opacity / 100 * 255))
 
+	def mix(self, other: UIColor, t):
+		# channels are clamped, springs overshoot
+		channels = (min(255, max(0, round(a + (b - a) * t))) for a, b in zip(self.rgba, other.rgba))
+		return UIColor("".join(f"{channel:02X}" for channel in channels))
+
 
 # TODO: gradient from scratch (draw lines)
 class CGGradientPoint:
@@ -60,20 +101,713 @@ class UIScreen:
 		self.height = height
 
 
+class UIBatch(pyglet.graphics.Batch):
+
+	draw_calls = 0
+
+	def _update_draw_list(self):
+		super()._update_draw_list()
+		# group state changes are bound methods, everything else draws a vertex domain
+		self.draw_calls = sum(1 for func in self._draw_list if not hasattr(func, "__self__"))
+
+
+def union_rect(a, b):
+	# rects are (left, bottom, right, top)
+	return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def intersect_rect(a, b):
+	# None when rects don't overlap
+	left, bottom, right, top = max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])
+	return (left, bottom, right, top) if left < right and bottom < top else None
+
+
+class UIRenderer:
+
+	# views describe how they look with these commands, a backend keeps what it needs between frames
+	# key is the view, frames are (x, y, width, height), clips (left, bottom, right, top), colors rgba
+	def begin(self):
+		# views of a window are about to send commands
+		pass
+
+	def place(self, key, z, clip=None, layer=None):
+		# clip is key of a view placed before, key draws only inside rect that view last passed to clip()
+		# layer is key of view placed before or key itself, backend may draw keys of a layer once and reuse result
+		pass
+
+	def clip(self, key, rect):
+		pass
+
+	def rect(self, key, frame, color):
+		# background, None frame removes it
+		pass
+
+	def stroke(self, key, frame, width, color):
+		# line around frame, 0 width removes it
+		pass
+
+	def text(self, key, text, font_name, font_size, style: UITextStyle, h_align: UIHorizonalTextAlignment, v_align: UIVerticalTextAlignment, position, color):
+		# returns clip text is drawn in when backend knows it
+		return None
+
+	def lines(self, key, runs, font_name, font_size, style: UITextStyle, h_align: UIHorizonalTextAlignment, color):
+		# laid out text, runs are (text, position) of lines anchored at their top, returns clip like text()
+		return None
+
+	def image(self, key, path, frame, opacity) -> bool:
+		# returns whether image could be drawn
+		return os.path.exists(path)
+
+	def quads(self, key, count, indices, rects, colors):
+		# count rectangles drawn together, rects (left, bottom, right, top) and colors rgba of quads at indices are replaced
+		# rects and colors have 4 values per index, indices are ascending
+		pass
+
+	def remove(self, key):
+		pass
+
+	def render(self, clip) -> int:
+		# draws changed scene inside clip, returns number of draw calls
+		return 0
+
+	def snapshot(self):
+		# copy of scene as last rendered, None when backend keeps no scene
+		return None
+
+	def present(self, width, height, snapshot=None, overlay=None):
+		# snapshot is drawn in place of scene, overlay is (snapshot, x offset, opacity) drawn over it
+		pass
+
+
+class UIGLRenderer(UIRenderer):
+
+	# rectangles created by all GL renderers, read by UIProfiler
+	shapes_created = 0
+
+	def __init__(self, canvas: pyglet.window.Window):
+		self.canvas = canvas
+		self.batch = UIBatch()
+		# scene is kept in a texture, only damaged part of it is redrawn
+		self.scene = pyglet.image.Texture.create(*canvas.get_framebuffer_size())
+		self.framebuffer = pyglet.image.Framebuffer()
+		self.framebuffer.attach_texture(self.scene)
+		self.groups: dict[object, pyglet.graphics.Group] = {}
+		# background and four stroke lines of a view
+		self.shapes: dict[object, list[pyglet.shapes.Rectangle]] = {}
+		self.labels: dict[object, pyglet.text.Label] = {}
+		# one label per line of laid out text, and union of their boxes
+		self.line_labels: dict[object, list[pyglet.text.Label]] = {}
+		self.line_bounds: dict[object, tuple] = {}
+		self.sprites: dict[object, pyglet.sprite.Sprite] = {}
+		self.image_paths: dict[object, str] = {}
+		# sprites nothing is drawn over are moved here, sprites of one atlas texture then take one draw call
+		self.image_layer = pyglet.graphics.Group(order=math.inf)
+		# drawn area of every key by z, keys moved since last render are rechecked before drawing
+		self.extents = UIHitGrid()
+		self.moved = set()
+		# clipping key -> parent group of keys placed in its clip
+		self.scissors: dict[object, UIScissorGroup] = {}
+		# scene pixels render() redraws, clipped groups scissor inside them
+		self.scissor = None
+		# rasterizing key -> its layer, and layer every key drawn into one is in
+		self.layers: dict[object, UILayer] = {}
+		self.layer_of: dict[object, UILayer] = {}
+		# window origin and pixel size of texture being drawn, scene or a layer
+		self.target = (0, 0, self.scene.width, self.scene.height)
+		# sprite of snapshot present() draws over scene
+		self.overlay: pyglet.sprite.Sprite = None
+		# one vertex list of quads per key, and union of their rects
+		self.quad_lists: dict[object, pyglet.graphics.vertexdomain.VertexList] = {}
+		self.quad_bounds: dict[object, tuple] = {}
+
+	def begin(self):
+		# vertex arrays belong to context of the window they were created in
+		self.canvas.switch_to()
+
+	def place(self, key, z, clip=None, layer=None):
+		if layer is not None:
+			if layer == key:
+				# quad of layer texture is drawn at z of rasterized view
+				self.layers[key] = UILayer(pyglet.graphics.Group(order=z, parent=self.scissor_group(clip)))
+			layer = self.layer_of[key] = self.layers[layer]
+		# clip from outside of a layer applies to its quad
+		parent = self.scissor_group(clip) if self.layer_of.get(clip) is layer else None
+		self.groups[key] = pyglet.graphics.Group(order=z, parent=parent)
+
+	def scissor_group(self, clip):
+		if clip is None:
+			return None
+		parent = self.scissors.get(clip)
+		if parent is None:
+			# right after clipping view, before anything outside of its subviews
+			parent = self.scissors[clip] = UIScissorGroup(self, self.groups[clip].order + 0.5)
+		return parent
+
+	def batch_of(self, key):
+		layer = self.layer_of.get(key)
+		return self.batch if layer is None else layer.batch
+
+	def touch(self, key):
+		# any command for a key drawn into a layer redraws whole layer
+		layer = self.layer_of.get(key)
+		if layer is not None:
+			layer.dirty = True
+
+	def clip(self, key, rect):
+		scissor = self.scissors.get(key)
+		if scissor is not None:
+			scissor.rect = rect
+
+	def scene_rect(self, rect, margin=0):
+		# window rect to pixels of texture being drawn
+		x, y, width, height = self.target
+		left, bottom, right, top = rect[0] - x, rect[1] - y, rect[2] - x, rect[3] - y
+		scale = self.scene.width / self.canvas.width
+		left, bottom = max(0, int((left - margin) * scale)), max(0, int((bottom - margin) * scale))
+		right, top = min(width, int((right + margin) * scale) + margin), min(height, int((top + margin) * scale) + margin)
+		return left, bottom, right, top
+
+	def fill(self, key, slot, frame, color):
+		self.touch(key)
+		shapes = self.shapes.setdefault(key, [None] * 5)
+		shape = shapes[slot]
+		if frame is None:
+			if shape is not None:
+				shape.delete()
+				shapes[slot] = None
+				self.moved.add(key)
+			return
+		x, y, width, height = frame
+		if shape is None:
+			shapes[slot] = pyglet.shapes.Rectangle(x, y, width, height, color=color, batch=self.batch_of(key), group=self.groups[key])
+			UIGLRenderer.shapes_created += 1
+			self.moved.add(key)
+		else:
+			if (shape.x, shape.y, shape.width, shape.height) != frame:
+				self.moved.add(key)
+			shape.position = (x, y)
+			shape.width = width
+			shape.height = height
+			shape.color = color
+
+	def rect(self, key, frame, color):
+		self.fill(key, 0, frame, color)
+
+	def stroke(self, key, frame, width, color):
+		if width == 0:
+			for slot in range(1, 5):
+				self.fill(key, slot, None, color)
+			return
+		x, y, w, h = frame
+		self.fill(key, 1, (x - width, y, width, h + width), color)
+		self.fill(key, 2, (x, y + h, w + width, width), color)
+		self.fill(key, 3, (x + w, y - width, width, h + width), color)
+		self.fill(key, 4, (x - width, y - width, w + width, width), color)
+
+	def text(self, key, text, font_name, font_size, style, h_align, v_align, position, color):
+		self.touch(key)
+		self.remove_lines(key)
+		previous = self.labels.get(key)
+		previous_position = previous and previous.position[:2]
+		previous_text = previous and previous.text
+		label = label_reuse.update(previous, (text, font_name, font_size, style, h_align, v_align), position, color, self.batch_of(key), self.groups[key])
+		self.labels[key] = label
+		# text changed in the same label has other glyph bounds
+		if label is not previous or label.position[:2] != previous_position or text != previous_text:
+			self.moved.add(key)
+		return self.label_bounds(label)
+
+	def lines(self, key, runs, font_name, font_size, style, h_align, color):
+		self.touch(key)
+		label_reuse.release(self.labels.pop(key, None))
+		# labels of lines whose text is still there are moved, only new lines are laid out
+		previous: dict[str, list[pyglet.text.Label]] = {}
+		for label in self.line_labels.get(key, ()):
+			previous.setdefault(label_reuse.keys[label][0], []).append(label)
+		labels = []
+		changed = False
+		for text, position in runs:
+			label = None
+			reused = previous.get(text)
+			if reused:
+				# repeated lines keep their places
+				label = next((label for label in reused if label.position[:2] == position), reused[-1])
+				reused.remove(label)
+			label_position = label and label.position[:2]
+			labels.append(label_reuse.update(label, (text, font_name, font_size, style, h_align, UIVerticalTextAlignment.top), position, color, self.batch_of(key), self.groups[key]))
+			changed = changed or label is None or label_position != position
+		for unused in previous.values():
+			for label in unused:
+				label_reuse.release(label)
+				changed = True
+		self.line_labels[key] = labels
+		bounds = self.line_bounds[key] = functools.reduce(union_rect, map(self.label_bounds, labels)) if labels else None
+		if changed:
+			self.moved.add(key)
+		return bounds
+
+	def remove_lines(self, key):
+		for label in self.line_labels.pop(key, ()):
+			label_reuse.release(label)
+		self.line_bounds.pop(key, None)
+
+	def label_bounds(self, label: pyglet.text.Label):
+		# text may be drawn outside of the view
+		x, y = label.x, label.y
+		width, height = label.content_width, label.content_height
+		left = {"left": x, "center": x - width / 2, "right": x - width}[label.anchor_x]
+		bottom = {"bottom": y, "center": y - height / 2, "top": y - height}[label.anchor_y]
+		return (left, bottom, left + width, bottom + height)
+
+	def glyph_bounds(self, label: pyglet.text.Label):
+		# quads glyphs are drawn in, layout box of large fonts reaches far above and below them
+		for vertex_list in label._vertex_lists:
+			dx = vertex_list.translation[0] + vertex_list.anchor[0]
+			dy = vertex_list.translation[1] + vertex_list.anchor[1]
+			position = vertex_list.position[:]
+			xs, ys = position[0::3], position[1::3]
+			if xs:
+				yield (min(xs) + dx, min(ys) + dy, max(xs) + dx, max(ys) + dy)
+
+	def image(self, key, path, frame, opacity) -> bool:
+		self.touch(key)
+		if self.image_paths.get(key) != path:
+			self.remove_image(key)
+			texture = image_atlas.region(path)
+			if texture is None:
+				texture = image_cache.acquire(path)
+				if texture is None:
+					return False
+			self.image_paths[key] = path
+			# most images are not covered, render moves covered ones back to their z before drawing
+			group = self.groups[key] if self.groups[key].parent is not None or key in self.layer_of else self.image_layer
+			self.sprites[key] = pyglet.sprite.Sprite(texture, batch=self.batch_of(key), group=group)
+		sprite = self.sprites[key]
+		x, y, width, height = frame
+		scale = (width / sprite.image.width, height / sprite.image.height)
+		if sprite.position[:2] != (x, y) or (sprite.scale_x, sprite.scale_y) != scale:
+			sprite.update(x=x, y=y, scale_x=scale[0], scale_y=scale[1])
+			self.moved.add(key)
+		sprite.opacity = round(opacity / 100 * 255)
+		return True
+
+	def quads(self, key, count, indices, rects, colors):
+		self.touch(key)
+		vertex_list = self.quad_lists.get(key)
+		if vertex_list is None or vertex_list.count != count * 6:
+			self.remove_quads(key)
+			self.moved.add(key)
+			if count == 0:
+				return
+			# colors are normalized bytes like colors of shapes, regions freed by other vertex lists are not cleared
+			program = pyglet.shapes.get_default_shader()
+			vertex_list = self.quad_lists[key] = program.vertex_list(count * 6, pyglet.gl.GL_TRIANGLES, self.batch_of(key), UIQuadGroup(program, self.groups[key]), colors=("Bn", (0,) * count * 24), translation=("f", (0, 0) * count * 6), rotation=("f", (0,) * count * 6))
+		if not indices:
+			return
+		positions, vertex_colors = vertex_list.position, vertex_list.colors
+		# two triangles of 2d positions and 6 copies of color per quad
+		quads = zip(*[iter(rects)] * 4)
+		if len(indices) == count:
+			data = array.array("f", itertools.chain.from_iterable((l, b, r, b, r, t, l, b, r, t, l, t) for l, b, r, t in quads))
+			ctypes.memmove(positions, data.buffer_info()[0], len(data) * data.itemsize)
+			data = array.array("B", itertools.chain.from_iterable(rgba * 6 for rgba in zip(*[iter(colors)] * 4)))
+			ctypes.memmove(vertex_colors, data.buffer_info()[0], len(data))
+		else:
+			for n, (index, (l, b, r, t)) in enumerate(zip(indices, quads)):
+				positions[index * 12:index * 12 + 12] = (l, b, r, b, r, t, l, b, r, t, l, t)
+				vertex_colors[index * 24:index * 24 + 24] = tuple(colors[n * 4:n * 4 + 4]) * 6
+		bounds = (min(rects[0::4]), min(rects[1::4]), max(rects[2::4]), max(rects[3::4]))
+		previous = self.quad_bounds.get(key)
+		self.quad_bounds[key] = bounds if previous is None or len(indices) == count else union_rect(previous, bounds)
+		self.moved.add(key)
+
+	def remove_quads(self, key):
+		vertex_list = self.quad_lists.pop(key, None)
+		if vertex_list is not None:
+			vertex_list.delete()
+		self.quad_bounds.pop(key, None)
+
+	def remove_image(self, key):
+		sprite = self.sprites.pop(key, None)
+		if sprite is not None:
+			sprite.delete()
+			self.moved.add(key)
+		path = self.image_paths.pop(key, None)
+		if path is not None and image_atlas.region(path) is None:
+			image_cache.release(path)
+
+	def remove(self, key):
+		self.touch(key)
+		self.layer_of.pop(key, None)
+		layer = self.layers.pop(key, None)
+		if layer is not None:
+			layer.delete()
+		for shape in self.shapes.pop(key, ()):
+			if shape is not None:
+				shape.delete()
+		label_reuse.release(self.labels.pop(key, None))
+		self.remove_lines(key)
+		self.remove_image(key)
+		self.remove_quads(key)
+		self.groups.pop(key, None)
+		self.scissors.pop(key, None)
+		self.extents.remove(key)
+		self.moved.discard(key)
+
+	def extent(self, key):
+		rects = [(shape.x, shape.y, shape.x + shape.width, shape.y + shape.height) for shape in self.shapes.get(key, ()) if shape is not None]
+		if key in self.labels:
+			rects.extend(self.glyph_bounds(self.labels[key]))
+		if self.line_bounds.get(key) is not None:
+			rects.append(self.line_bounds[key])
+		if key in self.quad_bounds:
+			rects.append(self.quad_bounds[key])
+		if key in self.sprites:
+			sprite = self.sprites[key]
+			rects.append((sprite.x, sprite.y, sprite.x + sprite.width, sprite.y + sprite.height))
+		return functools.reduce(union_rect, rects) if rects else None
+
+	def lift_images(self):
+		# drawing an image later than its z only matters where something above it overlaps
+		for key in self.moved:
+			extent = self.extent(key)
+			if extent is None:
+				self.extents.remove(key)
+			else:
+				self.extents.update(key, extent, self.groups[key].order)
+		self.moved.clear()
+		for key, sprite in self.sprites.items():
+			group = self.groups[key]
+			# clipped sprites stay in their scissor, sprites of layers in their batch
+			covered = group.parent is not None or key in self.layer_of or any(self.extents.rects[other][4] > group.order for other in self.extents.overlapping(sprite.x, sprite.y, sprite.x + sprite.width, sprite.y + sprite.height))
+			sprite.group = group if covered else self.image_layer
+
+	def rasterize(self, key, layer: UILayer) -> int:
+		# whole layer is redrawn inside bounds of its view, texture is kept while their size stays
+		layer.dirty = False
+		extent = self.extent(key)
+		if extent is None:
+			layer.delete()
+			return 0
+		left, bottom, right, top = math.floor(extent[0]), math.floor(extent[1]), math.ceil(extent[2]), math.ceil(extent[3])
+		scale = self.scene.width / self.canvas.width
+		width, height = round((right - left) * scale), round((top - bottom) * scale)
+		if layer.texture is None or (layer.texture.width, layer.texture.height) != (width, height):
+			layer.delete()
+			# texels map to pixels one to one
+			layer.texture = pyglet.image.Texture.create(width, height, min_filter=pyglet.gl.GL_NEAREST, mag_filter=pyglet.gl.GL_NEAREST)
+			layer.framebuffer = pyglet.image.Framebuffer()
+			layer.framebuffer.attach_texture(layer.texture)
+			layer.sprite = pyglet.sprite.Sprite(layer.texture, batch=self.batch, group=layer.group)
+		layer.sprite.update(x=left, y=bottom, scale_x=(right - left) / width, scale_y=(top - bottom) / height)
+		# opaque background covers whole layer, keep texture opaque like scene under it
+		shapes = self.shapes.get(key, ())
+		opaque = bool(shapes) and shapes[0] is not None and all(shape is None or shape.opacity == 255 for shape in shapes)
+
+		projection, view = self.canvas.projection, self.canvas.view
+		self.canvas.projection = pyglet.math.Mat4.orthogonal_projection(left, right, bottom, top, -255, 255)
+		self.canvas.view = pyglet.math.Mat4()
+		self.target = (left, bottom, width, height)
+		self.scissor = (0, 0, width, height)
+		layer.framebuffer.bind()
+		pyglet.gl.glViewport(0, 0, width, height)
+		pyglet.gl.glEnable(pyglet.gl.GL_SCISSOR_TEST)
+		pyglet.gl.glScissor(0, 0, width, height)
+		pyglet.gl.glClearColor(0, 0, 0, 1 if opaque else 0)
+		self.canvas.clear()
+		pyglet.gl.glClearColor(0, 0, 0, 0)
+		pyglet.gl.glColorMask(True, True, True, not opaque)
+		layer.batch.draw()
+		pyglet.gl.glColorMask(True, True, True, True)
+		pyglet.gl.glDisable(pyglet.gl.GL_SCISSOR_TEST)
+		layer.framebuffer.unbind()
+		self.canvas.viewport = self.canvas.viewport
+		self.canvas.projection, self.canvas.view = projection, view
+		self.target = (0, 0, self.scene.width, self.scene.height)
+		return layer.batch.draw_calls
+
+	def render(self, clip) -> int:
+		# redraw clip in scene texture, 1px more for antialiased edges
+		left, bottom, right, top = self.scene_rect(clip, margin=1)
+		if right <= left or top <= bottom:
+			return 0
+		if self.moved:
+			self.lift_images()
+		draw_calls = 0
+		for key, layer in self.layers.items():
+			redrawn = layer.dirty
+			if redrawn:
+				draw_calls += self.rasterize(key, layer)
+			if UI_DEBUG_LAYERS and layer.sprite is not None:
+				layer.sprite.color = (255, 160, 160) if redrawn else (160, 255, 160)
+
+		self.scissor = (left, bottom, right, top)
+		self.framebuffer.bind()
+		pyglet.gl.glEnable(pyglet.gl.GL_SCISSOR_TEST)
+		pyglet.gl.glScissor(left, bottom, right - left, top - bottom)
+		self.canvas.clear()
+		self.batch.draw()
+		pyglet.gl.glDisable(pyglet.gl.GL_SCISSOR_TEST)
+		self.framebuffer.unbind()
+		return draw_calls + self.batch.draw_calls
+
+	def snapshot(self):
+		texture = pyglet.image.Texture.create(self.scene.width, self.scene.height, min_filter=pyglet.gl.GL_NEAREST, mag_filter=pyglet.gl.GL_NEAREST)
+		framebuffer = pyglet.image.Framebuffer()
+		framebuffer.attach_texture(texture)
+		framebuffer.bind()
+		self.scene.blit(0, 0, width=self.canvas.width, height=self.canvas.height)
+		framebuffer.unbind()
+		framebuffer.delete()
+		return texture
+
+	def present(self, width, height, snapshot=None, overlay=None):
+		(snapshot or self.scene).blit(0, 0, width=width, height=height)
+		if overlay is not None:
+			snapshot, x, opacity = overlay
+			if self.overlay is None or self.overlay.image is not snapshot:
+				self.overlay = pyglet.sprite.Sprite(snapshot)
+			self.overlay.update(x=x, scale_x=width / snapshot.width, scale_y=height / snapshot.height)
+			self.overlay.opacity = round(opacity / 100 * 255)
+			self.overlay.draw()
+		else:
+			self.overlay = None
+
+
+class UIScissorGroup(pyglet.graphics.Group):
+
+	# draws child groups only inside rect of clipping view and damaged area renderer redraws
+	def __init__(self, renderer: UIGLRenderer, order):
+		super().__init__(order=order)
+		self.renderer = renderer
+		self.rect = None
+
+	def set_state(self):
+		scissor = self.renderer.scissor
+		if self.rect is not None:
+			scissor = intersect_rect(scissor, self.renderer.scene_rect(self.rect)) or (0, 0, 0, 0)
+		left, bottom, right, top = scissor
+		pyglet.gl.glScissor(left, bottom, right - left, top - bottom)
+
+	def unset_state(self):
+		left, bottom, right, top = self.renderer.scissor
+		pyglet.gl.glScissor(left, bottom, right - left, top - bottom)
+
+
+class UIQuadGroup(pyglet.graphics.Group):
+
+	# blended quads of UIGLRenderer.quads() drawn with shader of shapes
+	def __init__(self, program: pyglet.graphics.shader.ShaderProgram, parent: pyglet.graphics.Group):
+		super().__init__(parent=parent)
+		self.program = program
+
+	def set_state(self):
+		self.program.use()
+		pyglet.gl.glEnable(pyglet.gl.GL_BLEND)
+		pyglet.gl.glBlendFunc(pyglet.gl.GL_SRC_ALPHA, pyglet.gl.GL_ONE_MINUS_SRC_ALPHA)
+
+	def unset_state(self):
+		pyglet.gl.glDisable(pyglet.gl.GL_BLEND)
+		self.program.stop()
+
+
+class UILayer:
+
+	# rasterized view and its subviews, kept in own batch and texture which is drawn as one quad
+	def __init__(self, group: pyglet.graphics.Group):
+		self.group = group
+		self.batch = UIBatch()
+		self.texture: pyglet.image.Texture = None
+		self.framebuffer: pyglet.image.Framebuffer = None
+		self.sprite: pyglet.sprite.Sprite = None
+		self.dirty = True
+
+	def delete(self):
+		# texture is freed with last reference, batch may still hash sprite group by it until next draw
+		if self.sprite is not None:
+			self.sprite.delete()
+			self.framebuffer.delete()
+		self.sprite = self.framebuffer = self.texture = None
+
+
+class UIRecordingRenderer(UIRenderer):
+
+	# keeps commands as JSON lists, one list per rendered frame, and passes them on to target when there is one
+	def __init__(self, target: UIRenderer = None):
+		self.target = target or UIRenderer()
+		self.ids = weakref.WeakKeyDictionary()
+		self.next_id = itertools.count()
+		self.frames: list[list[list]] = []
+		self.commands: list[list] = []
+
+	def id(self, key):
+		# replayed commands use ints as keys already
+		if isinstance(key, int):
+			return key
+		if key not in self.ids:
+			self.ids[key] = next(self.next_id)
+		return self.ids[key]
+
+	def begin(self):
+		self.target.begin()
+
+	def place(self, key, z, clip=None, layer=None):
+		self.commands.append(["place", self.id(key), z, None if clip is None else self.id(clip), None if layer is None else self.id(layer)])
+		self.target.place(key, z, clip, layer)
+
+	def clip(self, key, rect):
+		self.commands.append(["clip", self.id(key), list(rect)])
+		self.target.clip(key, rect)
+
+	def rect(self, key, frame, color):
+		self.commands.append(["rect", self.id(key), frame and list(frame), list(color)])
+		self.target.rect(key, frame, color)
+
+	def stroke(self, key, frame, width, color):
+		self.commands.append(["stroke", self.id(key), list(frame), width, list(color)])
+		self.target.stroke(key, frame, width, color)
+
+	def text(self, key, text, font_name, font_size, style, h_align, v_align, position, color):
+		self.commands.append(["text", self.id(key), text, font_name, font_size, style.name, h_align.name, v_align.name, list(position), list(color)])
+		return self.target.text(key, text, font_name, font_size, style, h_align, v_align, position, color)
+
+	def lines(self, key, runs, font_name, font_size, style, h_align, color):
+		self.commands.append(["lines", self.id(key), [[text, list(position)] for text, position in runs], font_name, font_size, style.name, h_align.name, list(color)])
+		return self.target.lines(key, runs, font_name, font_size, style, h_align, color)
+
+	def image(self, key, path, frame, opacity) -> bool:
+		self.commands.append(["image", self.id(key), path, list(frame), opacity])
+		return self.target.image(key, path, frame, opacity)
+
+	def quads(self, key, count, indices, rects, colors):
+		self.commands.append(["quads", self.id(key), count, list(indices), list(rects), list(colors)])
+		self.target.quads(key, count, indices, rects, colors)
+
+	def remove(self, key):
+		self.commands.append(["remove", self.id(key)])
+		self.target.remove(key)
+
+	def render(self, clip) -> int:
+		self.commands.append(["render", list(clip)])
+		self.frames.append(self.commands)
+		self.commands = []
+		return self.target.render(clip)
+
+	def snapshot(self):
+		return self.target.snapshot()
+
+	def present(self, width, height, snapshot=None, overlay=None):
+		self.target.present(width, height, snapshot, overlay)
+
+	def redundant(self):
+		# commands which repeat last command for the same view, work which changed nothing
+		last: dict[int, dict[str, list]] = {}
+		repeated = []
+		for index, commands in enumerate(self.frames):
+			for command in commands:
+				if command[0] == "remove":
+					last.pop(command[1], None)
+				elif command[0] != "render":
+					view = last.setdefault(command[1], {})
+					if view.get(command[0]) == command:
+						repeated.append((index, command))
+					view[command[0]] = command
+		return repeated
+
+	def save(self, path):
+		with open(path, "w") as f:
+			json.dump(self.frames, f)
+
+	@staticmethod
+	def load(path) -> list[list[list]]:
+		with open(path) as f:
+			return json.load(f)
+
+	@staticmethod
+	def replay(frames: list[list[list]], renderer: UIRenderer):
+		# view ids of recording are keys of replayed views
+		draw_calls = 0
+		for commands in frames:
+			renderer.begin()
+			for name, *args in commands:
+				if name == "place":
+					renderer.place(*args)
+				elif name == "clip":
+					key, rect = args
+					renderer.clip(key, tuple(rect))
+				elif name == "rect":
+					key, frame, color = args
+					renderer.rect(key, frame and tuple(frame), tuple(color))
+				elif name == "stroke":
+					key, frame, width, color = args
+					renderer.stroke(key, tuple(frame), width, tuple(color))
+				elif name == "text":
+					key, text, font_name, font_size, style, h_align, v_align, position, color = args
+					renderer.text(key, text, font_name, font_size, UITextStyle[style], UIHorizonalTextAlignment[h_align], UIVerticalTextAlignment[v_align], tuple(position), tuple(color))
+				elif name == "lines":
+					key, runs, font_name, font_size, style, h_align, color = args
+					renderer.lines(key, [(text, tuple(position)) for text, position in runs], font_name, font_size, UITextStyle[style], UIHorizonalTextAlignment[h_align], tuple(color))
+				elif name == "image":
+					key, path, frame, opacity = args
+					renderer.image(key, path, tuple(frame), opacity)
+				elif name == "quads":
+					renderer.quads(*args)
+				elif name == "remove":
+					renderer.remove(*args)
+				elif name == "render":
+					draw_calls += renderer.render(tuple(args[0]))
+		return draw_calls
+
+
+class UITransitionStyle(Enum):
+	none = "none"
+	fade = "fade"
+	slide = "slide"
+
+
+class UITransition:
+
+	# screen left behind, drawn over shown one until progress is 1, animated like a view attribute
+	def __init__(self, window: UIWindow, snapshot, style: UITransitionStyle, direction):
+		self.window = window
+		self.snapshot = snapshot
+		self.style = style
+		# 1 slides to the right when going back, -1 to the left
+		self.direction = direction
+		self.progress = 0.0
+
+	def overlay(self):
+		if self.style is UITransitionStyle.slide:
+			return (self.snapshot, round(self.direction * self.progress * self.window.width), 100)
+		return (self.snapshot, 0, (1 - self.progress) * 100)
+
+
 class UIWindow:
 
-	def __init__(self, x=0, y=0, width=0, height=0, title="UIKit", view_controller: type[UIViewController] = None, screen=UIScreen()):
+	# redraw rate while views change and rate of checking for changes when nothing is dirty
+	frame_interval = 1 / 60
+	idle_interval = 1 / 2
+	# presented controllers kept for back navigation, older ones are released
+	navigation_depth = 8
+	transition_duration = 0.25
+
+	def __init__(self, x=0, y=0, width=0, height=0, title="UIKit", view_controller: type[UIViewController] = None, screen=UIScreen(), debug=False, transition: UITransitionStyle = UITransitionStyle.none):
 		self.x = x
 		self.y = y
 		self.width = width
 		self.height = height
 		self.screen = screen
 		self.title = title
-		self.view_controller = view_controller()
+		with startup_trace.phase("controllers"):
+			self.view_controller = view_controller()
 		self.view_controller.view.width = width
 		self.view_controller.view.height = height
 		self.view_controller.window = self
+		self.navigation_stack: list[UIViewController] = [self.view_controller]
 		self.exit = False
+		# print per frame stats
+		self.debug = debug
+		self.transition_style = transition
 
 
 	def create(self):
@@ -83,48 +817,251 @@ class UIWindow:
 		if self.height == 0:
 			self.height = self.screen.height
 			self.view_controller.view.height = self.height
-		self.canvas = pyglet.window.Window(
-			width = self.width,
-			height = self.height,
-			caption = self.title
-		)
+		with startup_trace.phase("window"):
+			self.canvas = pyglet.window.Window(
+				width = self.width,
+				height = self.height,
+				caption = self.title
+			)
 		self.canvas.set_location(self.x, self.y)
 		cursor = self.canvas.get_system_mouse_cursor(self.canvas.CURSOR_HAND)
 		self.canvas.set_mouse_cursor(cursor)
 
-		self.batch = pyglet.graphics.Batch()
+		# can be wrapped in UIRecordingRenderer before first frame
+		self.renderer: UIRenderer = UIGLRenderer(self.canvas)
+		self.draw_list: list[UIView] = []
+		self.draw_list_root: UIView = None
+		# draw calls issued by last rendered frame, and seconds it took before presenting
+		self.draw_calls = 0
+		self.cpu_time = 0.0
+		self.damage = None
+		self.idle = True
+		self.hit_grid = UIHitGrid()
+		# scroll view which gets drags and release of current press, and view typing goes to
+		self.tracking: UIScrollView = None
+		self.first_responder: UITextInput = None
+		# renderer snapshots of controllers in navigation stack, taken when they were left
+		self.snapshots: dict[UIViewController, object] = {}
+		self.transition: UITransition = None
+		# snapshot of shown controller presented until its views are compiled, which waits one frame after show()
+		self.restored = None
+		self.restoring = False
 
 		# events
 		self.canvas.on_mouse_press = self._on_mouse_press
+		self.canvas.on_mouse_drag = self._on_mouse_drag
+		self.canvas.on_mouse_release = self._on_mouse_release
+		self.canvas.on_mouse_scroll = self._on_mouse_scroll
+		self.canvas.on_text = self._on_text
+		self.canvas.on_text_motion = self._on_text_motion
 		self.canvas.on_draw = self.draw
-
-		self.view_did_load()
-
-	def view_did_load(self):
-		self.view_controller.view_did_load()
-		for child_view_controller in self.view_controller.children:
-			child_view_controller.view_did_load()
-
+		self.canvas.on_expose = self.set_needs_display
+
+		self.show(self.view_controller)
+
+	def show(self, view_controller: UIViewController, back=False):
+		# views loaded and released by navigation keep graphics in context of this window, presses may come with another one current
+		self.renderer.begin()
+		previous = self.view_controller
+		view_controller.window = self
+		view_controller.view.width = self.width
+		view_controller.view.height = self.height
+		view_controller.load_view_if_needed()
+		view_controller.view_will_appear()
+		self.view_controller = view_controller
+		if previous is view_controller:
+			self.set_needs_display()
+			return
+		previous.view_did_disappear()
+		# screen being left is kept for going back to it, and drawn over shown one while transition runs
+		snapshot = self.restored
+		if snapshot is None and (not back or self.transition_style is not UITransitionStyle.none):
+			snapshot = self.renderer.snapshot()
+		if not back and snapshot is not None:
+			self.snapshots[previous] = snapshot
+		if snapshot is not None and self.transition_style is not UITransitionStyle.none:
+			self.transition = UITransition(self, snapshot, self.transition_style, 1 if back else -1)
+			animator.tween(self.transition, self.transition_duration, progress=1.0)
+		# going back shows last look of controller right away, compiling its views waits for next frame
+		self.restored = self.snapshots.pop(view_controller, None) if back else None
+		self.restoring = self.restored is not None
+		self.invalidate_draw_list()
+		self.set_needs_display()
+
+	def push(self, view_controller: UIViewController):
+		if view_controller in self.navigation_stack:
+			self.pop_to(view_controller)
+			return
+		self.navigation_stack.append(view_controller)
+		self.show(view_controller)
+		while len(self.navigation_stack) > self.navigation_depth:
+			released = self.navigation_stack.pop(0)
+			self.snapshots.pop(released, None)
+			released.release()
+
+	def pop_to(self, view_controller: UIViewController):
+		index = self.navigation_stack.index(view_controller)
+		popped = self.navigation_stack[index + 1:]
+		del self.navigation_stack[index + 1:]
+		self.show(view_controller, back=True)
+		for popped_view_controller in popped:
+			self.snapshots.pop(popped_view_controller, None)
+			popped_view_controller.release()
+
+	def pop(self):
+		if len(self.navigation_stack) > 1:
+			self.pop_to(self.navigation_stack[-2])
+
+	def set_needs_display(self, rect=None):
+		# rect is (left, bottom, right, top), whole window by default
+		rect = rect or (0, 0, self.width, self.height)
+		self.damage = union_rect(self.damage, rect) if self.damage else rect
+		self.wake()
+
+	def wake(self):
+		# something changed, don't wait for idle tick
+		if self.idle:
+			self.idle = False
+			pyglet.clock.unschedule(self.update)
+			pyglet.clock.schedule_once(self.update, 0)
+
+	def invalidate_draw_list(self):
+		self.draw_list_root = None
+		self.wake()
+
+	def compile(self):
+		# flat draw list of presented hierarchy, every view once, index is its z order
+		root = self.view_controller.view
+		draw_list = []
+		clips = []
+		compiled = set()
+		layers = []
+		# with nearest superview which clips to its bounds and outermost rasterized one
+		stack = [(root, None, None)]
+		while stack:
+			view, clip, layer = stack.pop()
+			if view not in compiled:
+				compiled.add(view)
+				if view.rasterize and layer is None:
+					layer = view
+				draw_list.append(view)
+				clips.append(clip)
+				layers.append(layer)
+				if view.clips_to_bounds:
+					clip = view
+				stack.extend((subview, clip, layer) for subview in reversed(view.subviews))
+
+		for view in self.draw_list:
+			if view not in compiled:
+				view.discard()
+		for z, view in enumerate(draw_list):
+			view.place(self, z, clips[z], layers[z])
+		self.draw_list = draw_list
+		self.draw_list_root = root
+		# whole window is drawn from views again
+		self.restored = None
+
+	def update(self, dt):
+		# closed window has no context to draw in, its scheduled update ends here
+		if self.canvas.context is None:
+			return
+		self.idle = False
+		label_reuse.frame_rebuilds = 0
+		start = time.perf_counter()
+		self.renderer.begin()
+		animator.step()
+		restoring = self.restoring
+		self.restoring = False
+		if not restoring:
+			if self.draw_list_root is not self.view_controller.view:
+				self.compile()
+			# views keep their shapes in the batch, draw() only updates changed ones and reports damage
+			if profiler is None:
+				for view in self.draw_list:
+					view.draw(self)
+			else:
+				profiler.draw_views(self)
+
+		self.idle = self.damage is None and not animator.animations and self.transition is None
+		self.draw_calls = 0
+		if not self.idle:
+			views_end = time.perf_counter()
+			if not restoring:
+				self.render()
+			render_end = time.perf_counter()
+			# software GL rasterizes while presenting, this is views, layout and draw calls
+			self.cpu_time = render_end - start
+			self.canvas.draw(dt)
+			if profiler is not None:
+				profiler.frame(self, start, views_end, render_end, time.perf_counter())
+			if self.debug:
+				print(f"frame: {self.draw_calls} draw calls, {label_reuse.frame_rebuilds} labels rebuilt")
+			if not startup_trace.done:
+				startup_trace.add("frame", start, time.perf_counter())
+				startup_trace.finish()
+		pyglet.clock.unschedule(self.update)
+		pyglet.clock.schedule_once(self.update, self.idle_interval if self.idle else self.frame_interval)
+
+	def render(self):
+		# redraw union of damaged rects
+		damage = self.damage
+		self.damage = None
+		# animations can run a frame without changing views
+		self.draw_calls = self.renderer.render(damage) if damage else 0
 
 	def draw(self):
+		# queued draw may run after another window made its context current
+		self.renderer.begin()
 		self.canvas.clear()
-		self.batch.draw()
-
-		self.view_controller.view.draw(self.batch)
-		for view in self.view_controller.view.subviews:
-			view.draw(self.batch)
-
-		for child_view_controller in self.view_controller.children:
-			child_view_controller.view.draw(self.batch)
-			for view in child_view_controller.view.subviews:
-				view.draw(self.batch)
+		transition = self.transition
+		self.renderer.present(self.width, self.height, self.restored, transition.overlay() if transition is not None and transition.progress < 1 else None)
+		if transition is not None and transition.progress >= 1:
+			# finished transition is presented once without screen left behind
+			self.transition = None
+		if profiler is not None:
+			profiler.draw_hud(self)
 
 	def _on_mouse_press(self, x, y, button, modifiers):
-		# TODO: check for children view controller's views
-		for view in self.view_controller.view.subviews:
-			if view.x <= x <= view.x + view.width and view.y <= y <= view.y + view.height:
+		start = time.perf_counter()
+		# hit grid has views of screen left behind while snapshot of shown one is presented
+		if self.restored is not None:
+			return
+		view = self.hit_grid.hit(x, y)
+		# pressing anywhere else ends typing
+		self.first_responder = None
+		if view is not None:
+			view = view.responder_at(x, y)
+			# presses in scroll views wait for release, they may turn into drags
+			self.tracking = view.enclosing_scroll_view()
+			if self.tracking is None:
 				view.mouse_down(view.arg)
-				return
+			else:
+				self.tracking.touch_down(view, x, y)
+		if profiler is not None:
+			profiler.event("mouse_press", start, time.perf_counter())
+
+	def _on_text(self, text):
+		if self.first_responder is not None:
+			self.first_responder.insert_text(text.replace("\r", "\n"))
+
+	def _on_text_motion(self, motion):
+		if self.first_responder is not None and motion == pyglet.window.key.MOTION_BACKSPACE:
+			self.first_responder.delete_backward()
+
+	def _on_mouse_drag(self, x, y, dx, dy, buttons, modifiers):
+		if self.tracking is not None:
+			self.tracking.touch_moved(x, y)
+
+	def _on_mouse_release(self, x, y, button, modifiers):
+		if self.tracking is not None:
+			self.tracking.touch_up(x, y)
+			self.tracking = None
+
+	def _on_mouse_scroll(self, x, y, scroll_x, scroll_y):
+		view = self.hit_grid.hit(x, y)
+		scroll_view = view and view.enclosing_scroll_view()
+		if scroll_view is not None:
+			scroll_view.scroll_wheel(scroll_y)
 
 	def close(self):
 		self.exit = True
@@ -146,7 +1083,200 @@ class UIApplication:
 			# TODO: let user change screen to draw window
 			window.screen = self.screens[0]
 			window.create()
-		pyglet.app.run()
+		# windows redraw themselves when their views change
+		pyglet.app.run(interval=None)
+
+
+class UITimer:
+
+	# align is a wall clock period, 60 fires at the start of every minute
+	def __init__(self, callback: callable, delay=None, interval=None, align=None):
+		self.callback = callback
+		self.interval = interval
+		self.align = align
+		pyglet.clock.schedule_once(self.fire, self.next_delay() if delay is None else delay)
+
+	def next_delay(self):
+		if self.align is not None:
+			# a bit past the boundary so callback sees the new minute
+			return self.align - time.time() % self.align + 0.01
+		return self.interval
+
+	def fire(self, dt):
+		# interval callback still waiting for its turn is not queued twice
+		if self.callback not in scheduler.queue:
+			scheduler.defer(self.callback)
+		if self.interval is not None or self.align is not None:
+			pyglet.clock.schedule_once(self.fire, self.next_delay())
+
+	def cancel(self):
+		pyglet.clock.unschedule(self.fire)
+		scheduler.cancel(self.callback)
+
+
+class UIScheduler:
+
+	# seconds of deferred work run per frame, the rest waits for next frame
+	frame_budget = 0.004
+
+	def __init__(self):
+		self.queue: deque[callable] = deque()
+		self.running = False
+
+	def once(self, callback: callable, delay) -> UITimer:
+		return UITimer(callback, delay)
+
+	def interval(self, callback: callable, interval, delay=None) -> UITimer:
+		return UITimer(callback, delay, interval=interval)
+
+	def aligned(self, callback: callable, period) -> UITimer:
+		# fires on wall clock multiples of period
+		return UITimer(callback, align=period)
+
+	def defer(self, callback: callable):
+		self.queue.append(callback)
+		if not self.running:
+			self.running = True
+			pyglet.clock.schedule_once(self.run, 0)
+
+	def cancel(self, callback: callable):
+		while callback in self.queue:
+			self.queue.remove(callback)
+
+	def run(self, dt):
+		# callbacks change views, which wakes the windows to redraw them
+		deadline = time.perf_counter() + self.frame_budget
+		while self.queue:
+			self.queue.popleft()()
+			if time.perf_counter() >= deadline:
+				break
+		if self.queue:
+			pyglet.clock.schedule_once(self.run, UIWindow.frame_interval)
+		else:
+			self.running = False
+
+
+scheduler = UIScheduler()
+
+
+class UIStartupTrace:
+
+	# time of startup phases until first frame is drawn, phases may nest, import includes fonts loaded by it
+	def __init__(self, start):
+		self.start = start
+		self.phases: dict[str, float] = {}
+		self.spans: list[tuple] = []
+		self.done = False
+
+	@contextlib.contextmanager
+	def phase(self, name):
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.add(name, start, time.perf_counter())
+
+	def add(self, name, start, end):
+		if not self.done:
+			self.phases[name] = self.phases.get(name, 0.0) + end - start
+			self.spans.append((name, start, end))
+
+	def finish(self):
+		if self.done:
+			return
+		self.add("total", self.start, time.perf_counter())
+		self.done = True
+		if profiler is not None:
+			print("STARTUP " + ", ".join(f"{name} {seconds * 1000:.1f} MS" for name, seconds in self.phases.items()))
+			for name, start, end in self.spans:
+				profiler.span(name, start, end)
+
+
+startup_trace = UIStartupTrace(STARTUP_TIME)
+
+
+class UIProfiler:
+
+	# frames averaged by HUD and trace events kept for export
+	history = 120
+	trace_limit = 200_000
+
+	def __init__(self, trace_path=None):
+		self.trace_path = trace_path
+		# trace starts with startup phases
+		self.origin = startup_trace.start
+		self.frames: deque[float] = deque(maxlen=self.history)
+		self.events: deque[dict] = deque(maxlen=self.trace_limit)
+		# seconds spent in draw of changed views by class, for last frame
+		self.view_times: dict[str, float] = {}
+		self.counters = self.totals()
+		self.created = dict.fromkeys(self.counters, 0)
+		self.last = None
+		# press waiting for a frame that shows its result
+		self.pending_event = None
+		self.latency = 0.0
+		self.hud: pyglet.text.Label = None
+		if trace_path is not None:
+			atexit.register(self.export)
+
+	def totals(self):
+		return {"labels": label_reuse.rebuilds, "textures": image_cache.misses, "shapes": UIGLRenderer.shapes_created}
+
+	def span(self, name, start, end, **args):
+		self.events.append({"name": name, "ph": "X", "pid": 0, "tid": 0, "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6, "args": args})
+
+	def draw_views(self, window: UIWindow):
+		self.view_times = {}
+		for view in window.draw_list:
+			if view.needs_display:
+				start = time.perf_counter()
+				view.draw(window)
+				end = time.perf_counter()
+				name = type(view).__name__
+				self.view_times[name] = self.view_times.get(name, 0.0) + end - start
+				self.span(name, start, end, x=view.x, y=view.y)
+			else:
+				view.draw(window)
+
+	def event(self, name, start, end):
+		self.span(name, start, end)
+		if self.pending_event is None:
+			self.pending_event = start
+
+	def frame(self, window: UIWindow, start, views_end, render_end, end):
+		self.frames.append(end - start)
+		totals = self.totals()
+		self.created = {name: totals[name] - self.counters[name] for name in totals}
+		self.counters = totals
+		self.span("views", start, views_end)
+		self.span("render", views_end, render_end, draw_calls=window.draw_calls)
+		self.span("present", render_end, end)
+		self.span("frame", start, end, **self.created)
+		if self.pending_event is not None:
+			self.latency = end - self.pending_event
+			self.span("input latency", self.pending_event, end)
+			self.pending_event = None
+		self.last = window
+
+	def draw_hud(self, window: UIWindow):
+		if self.last is not window or not self.frames:
+			return
+		average = sum(self.frames) / len(self.frames)
+		slowest = sorted(self.view_times.items(), key=lambda item: -item[1])[:3]
+		lines = [
+			f"frame {self.frames[-1] * 1000:.2f} ms  avg {average * 1000:.2f}  max {max(self.frames) * 1000:.2f}",
+			f"draw calls {window.draw_calls}  views {len(window.draw_list)}",
+			"created " + "  ".join(f"{name} {count}" for name, count in self.created.items()),
+			f"input latency {self.latency * 1000:.1f} ms",
+		] + [f"{name} {seconds * 1000:.2f} ms" for name, seconds in slowest]
+		if self.hud is None:
+			self.hud = pyglet.text.Label("", font_size=12, x=10, y=window.height - 10, width=600, multiline=True, anchor_y="top", color=(255, 0, 0, 255))
+		self.hud.text = "\n".join(lines)
+		self.hud.draw()
+
+	def export(self, path=None):
+		with open(path or self.trace_path, "w") as f:
+			json.dump({"traceEvents": list(self.events), "displayTimeUnit": "ms"}, f)
 
 
 class UIViewController:
@@ -156,19 +1286,40 @@ class UIViewController:
 		self.window: UIWindow = None
 		self.parent: UIViewController = None
 		self.children: list[UIViewController] = []
+		self.is_view_loaded = False
+		self.released = False
+
+	def load_view_if_needed(self):
+		if not self.is_view_loaded:
+			self.is_view_loaded = True
+			with startup_trace.phase("controllers"):
+				self.view_did_load()
+			for child_view_controller in self.children:
+				child_view_controller.load_view_if_needed()
 
 	def view_did_load(self):
 		pass
 
+	def view_will_appear(self):
+		pass
+
+	def view_did_disappear(self):
+		pass
+
 	def present(self, view_controller: UIViewController):
-		print("present")
-		view_controller.window = self.window
-		view_controller.parent = self
-		view_controller.view.width = self.window.width
-		view_controller.view.height = self.window.height
-		self.window.view_controller = view_controller
-		self.children.append(view_controller)
-		self.window.view_did_load()
+		start = time.perf_counter()
+		self.window.push(view_controller)
+		if profiler is not None:
+			profiler.span("push controller", start, time.perf_counter(), controller=type(view_controller).__name__)
+
+	def dismiss(self, arg=None):
+		self.window.pop()
+
+	def release(self):
+		# free labels and textures of controller which left navigation stack, it is not shown again
+		self.view.release()
+		self.window = None
+		self.released = True
 
 
 class UIEvent(Enum):
@@ -177,15 +1328,90 @@ class UIEvent(Enum):
 
 class UIResponder:
 
+	# subclasses without slots of their own keep attributes in __dict__
+	__slots__ = ()
 	# TODO: pass args instead of arg
 	arg = None
+	# views which don't take presses let them through to views below
+	user_interaction_enabled = True
+
+	def next_responder(self) -> UIResponder:
+		return None
+
+	def responder_at(self, x, y) -> UIResponder:
+		# responder inside this one which takes press at point
+		return self
 
 	def mouse_down(self, arg):
-		pass
+		# not handled here, pass it up the responder chain
+		responder = self.next_responder()
+		if responder is not None:
+			responder.mouse_down(responder.arg)
+
+
+class UIHitGrid:
+
+	cell_size = 128
+
+	def __init__(self):
+		self.cells: dict[tuple[int, int], set[UIResponder]] = {}
+		# responder -> (left, bottom, right, top, z)
+		self.rects: dict[UIResponder, tuple] = {}
+
+	def cells_of(self, left, bottom, right, top):
+		for i in range(int(left // self.cell_size), int(right // self.cell_size) + 1):
+			for j in range(int(bottom // self.cell_size), int(top // self.cell_size) + 1):
+				yield i, j
+
+	def cell_span(self, left, bottom, right, top):
+		return int(left // self.cell_size), int(bottom // self.cell_size), int(right // self.cell_size), int(top // self.cell_size)
+
+	def update(self, responder: UIResponder, rect, z):
+		previous = self.rects.get(responder)
+		if previous is not None and self.cell_span(*previous[:4]) == self.cell_span(*rect):
+			# moved inside the same cells
+			self.rects[responder] = (*rect, z)
+			return
+		self.remove(responder)
+		self.rects[responder] = (*rect, z)
+		for cell in self.cells_of(*rect):
+			self.cells.setdefault(cell, set()).add(responder)
+
+	def remove(self, responder: UIResponder):
+		rect = self.rects.pop(responder, None)
+		if rect is not None:
+			for cell in self.cells_of(*rect[:4]):
+				self.cells[cell].discard(responder)
+
+	def overlapping(self, left, bottom, right, top) -> set[UIResponder]:
+		# responders whose rects cross the rect, touching edges don't count
+		found = set()
+		for cell in self.cells_of(left, bottom, right, top):
+			for responder in self.cells.get(cell, ()):
+				other = self.rects[responder]
+				if other[0] < right and left < other[2] and other[1] < top and bottom < other[3]:
+					found.add(responder)
+		return found
+
+	def hit(self, x, y) -> UIResponder:
+		# topmost responder under the point, nested views are drawn over their superviews
+		hit, hit_z = None, None
+		for responder in self.cells.get((int(x // self.cell_size), int(y // self.cell_size)), ()):
+			left, bottom, right, top, z = self.rects[responder]
+			if left <= x <= right and bottom <= y <= top and (hit is None or z > hit_z):
+				hit, hit_z = responder, z
+		return hit
 
 
 class UIView(UIResponder):
 
+	# changing one of these attributes updates retained shapes on next draw
+	display_attributes = {"x", "y", "width", "height", "background_color", "stroke_color", "stroke_width", "opacity"}
+	# subviews draw and take presses only inside frame
+	clips_to_bounds = False
+	# view and subviews are drawn once into a texture inside bounds of view, which is redrawn when one of them changes
+	rasterize = False
+
 	def __init__(self, x=0, y=0, width=0, height=0, background_color: UIColor = UIColor("000000"), stroke_color: UIColor = UIColor("000000"), stroke_width=0, opacity=100):
 		self.x = x
 		self.y = y
@@ -197,64 +1423,913 @@ class UIView(UIResponder):
 		self.opacity = opacity
 
 		self.subviews: list[UIView] = []
+		self.superview: UIView = None
+
+		self.window: UIWindow = None
+		# (left, bottom, right, top) drawn at last display, redrawn when view changes
+		self.displayed_bounds = None
+		# draw order in window, superview view is clipped by and rasterized one it is drawn into
+		self.z = None
+		self.clip: UIView = None
+		self.layer: UIView = None
+		self.needs_display = True
+
+	def __setattr__(self, name, value):
+		if name in self.display_attributes and (name not in self.__dict__ or self.__dict__[name] != value):
+			super().__setattr__("needs_display", True)
+			if self.__dict__.get("window") is not None:
+				self.window.wake()
+		elif name == "rasterize" and self.__dict__.get("window") is not None:
+			self.window.invalidate_draw_list()
+		super().__setattr__(name, value)
 
 	def add_subview(self, view: UIView):
 		# TODO: think about this decision
-		view.x += self.x
-		view.y += self.y
+		# view is placed relative to superview, with subviews it already has
+		view.move_by(self.x, self.y)
+		view.superview = self
 		self.subviews.append(view)
-
-	def draw(self, batch):
+		if self.window is not None:
+			self.window.invalidate_draw_list()
+
+	def remove_from_superview(self):
+		self.superview.subviews.remove(self)
+		if self.window is not None:
+			self.window.invalidate_draw_list()
+		self.superview = None
+
+	def move_by(self, dx, dy):
+		# subviews are in window coordinates too
+		self.x += dx
+		self.y += dy
+		for view in self.subviews:
+			view.move_by(dx, dy)
+
+	def next_responder(self) -> UIResponder:
+		return self.superview
+
+	def enclosing_scroll_view(self) -> UIScrollView:
+		view = self
+		while view is not None and not isinstance(view, UIScrollView):
+			view = view.superview
+		return view
+
+	def clip_rect(self):
+		# area subviews are clipped to, (left, bottom, right, top) or None when nothing is left
+		rect = (self.x, self.y, self.x + self.width, self.y + self.height)
+		if self.clip is not None:
+			outer = self.clip.clip_rect()
+			return outer and intersect_rect(rect, outer)
+		return rect
+
+	def display(self, renderer: UIRenderer, background=True):
 		# TODO: add rounded rectangle (maybe replace with OpenGL GL_POINTS)
-		pyglet.shapes.Rectangle(self.x, self.y, self.width, self.height, color=self.background_color.get_rgba(opacity=self.opacity), batch=batch).draw()
-		if self.stroke_width != 0:
-			pyglet.shapes.Rectangle(self.x - self.stroke_width, self.y, self.stroke_width, self.height + self.stroke_width, color=self.stroke_color.get_rgba(opacity=self.opacity), batch=batch).draw()
-			pyglet.shapes.Rectangle(self.x, self.y + self.height, self.width + self.stroke_width, self.stroke_width, color=self.stroke_color.get_rgba(opacity=self.opacity), batch=batch).draw()
-			pyglet.shapes.Rectangle(self.x + self.width, self.y - self.stroke_width, self.stroke_width, self.height + self.stroke_width, color=self.stroke_color.get_rgba(opacity=self.opacity), batch=batch).draw()
-			pyglet.shapes.Rectangle(self.x - self.stroke_width, self.y - self.stroke_width, self.width + self.stroke_width, self.stroke_width, color=self.stroke_color.get_rgba(opacity=self.opacity), batch=batch).draw()
+		frame = (self.x, self.y, self.width, self.height)
+		renderer.rect(self, frame if background else None, self.background_color.get_rgba(opacity=self.opacity))
+		renderer.stroke(self, frame, self.stroke_width if background else 0, self.stroke_color.get_rgba(opacity=self.opacity))
+		self.needs_display = False
+
+	def set_needs_display(self):
+		self.needs_display = True
+		if self.window is not None:
+			self.window.wake()
+
+	def bounds(self):
+		return (self.x - self.stroke_width, self.y - self.stroke_width, self.x + self.width + self.stroke_width, self.y + self.height + self.stroke_width)
+
+	def place(self, window: UIWindow, z, clip: UIView = None, layer: UIView = None):
+		# graphics are recreated in new z order
+		if self.window is not window or self.z != z or self.clip is not clip or self.layer is not layer:
+			self.discard()
+			self.window = window
+			self.z = z
+			self.clip = clip
+			self.layer = layer
+			window.renderer.place(self, z, clip, layer)
+			if self.clips_to_bounds or layer is self:
+				# clip or layer is recreated, views inside it are placed again too
+				stack = list(self.subviews)
+				while stack:
+					view = stack.pop()
+					view.z = None
+					stack.extend(view.subviews)
+
+	def draw(self, window: UIWindow):
+		if self.needs_display:
+			self.display(window.renderer)
+			bounds = self.bounds()
+			window.set_needs_display(union_rect(self.displayed_bounds, bounds) if self.displayed_bounds else bounds)
+			self.displayed_bounds = bounds
+			if self.user_interaction_enabled:
+				self.update_hit_rect(window, self.hit_rect())
+
+	def hit_rect(self):
+		# area which takes presses before clipping, (left, bottom, right, top)
+		return (self.x, self.y, self.x + self.width, self.y + self.height)
+
+	def update_hit_rect(self, window: UIWindow, rect):
+		if self.clip is not None:
+			clip = self.clip.clip_rect()
+			rect = clip and intersect_rect(rect, clip)
+		if rect is None:
+			window.hit_grid.remove(self)
+		else:
+			window.hit_grid.update(self, rect, self.z)
+
+	def discard(self):
+		if self.window is not None:
+			self.window.renderer.remove(self)
+			self.window.hit_grid.remove(self)
+			if self.displayed_bounds is not None:
+				self.window.set_needs_display(self.displayed_bounds)
+		self.window = None
+		self.z = None
+		self.clip = None
+		self.layer = None
+		self.displayed_bounds = None
+		self.needs_display = True
+
+	def release(self):
+		self.discard()
 		for view in self.subviews:
-			view.draw(batch)
-			# pyglet.shapes.Rectangle(self.x + view.x, self.y + view.y, view.width, view.height, color=view.background_color.get_rgba(opacity=view.opacity), batch=batch).draw()
-			# TODO: perform formulas for strokes
-			# if view.stroke_width != 0:
-			# 	pyglet.shapes.Rectangle(view.x - view.stroke_width, view.y, view.stroke_width, view.height + view.stroke_width, color=self.stroke_color.get_rgba(opacity=self.opacity), batch=batch).draw()
-			# 	pyglet.shapes.Rectangle(view.x, view.y + view.height, view.width + self.stroke_width, self.stroke_width, color=self.stroke_color.get_rgba(opacity=self.opacity), batch=batch).draw()
-			# 	pyglet.shapes.Rectangle(view.x + view.width, view.y - view.stroke_width, view.stroke_width, self.height + self.stroke_width, color=self.stroke_color.get_rgba(opacity=self.opacity), batch=batch).draw()
-			# 	pyglet.shapes.Rectangle(view.x - view.stroke_width, view.y - view.stroke_width, view.width + self.stroke_width, self.stroke_width, color=self.stroke_color.get_rgba(opacity=self.opacity), batch=batch).draw()
+			view.release()
+
+
+def pack_color(color: UIColor):
+	return int.from_bytes(bytes(color.rgba), "big")
+
+
+def compact_attribute(name, color=False):
+	# attribute of UICompactView kept in column of its store, colors are packed rgba
+	def getter(view: UICompactView):
+		value = view.store.values[name][view.id]
+		return UIColor(f"{value:08X}") if color else value
+
+	def setter(view: UICompactView, value):
+		view.store.update(view.id, name, pack_color(value) if color else value)
+	return property(getter, setter)
+
+
+class UICompactView(UIResponder):
+
+	# view of UIViewStore, only a handle of id, frame, opacity and colors are in columns of the store
+	__slots__ = ("store", "id")
+
+	x = compact_attribute("x")
+	y = compact_attribute("y")
+	width = compact_attribute("width")
+	height = compact_attribute("height")
+	stroke_width = compact_attribute("stroke_width")
+	opacity = compact_attribute("opacity")
+	background_color = compact_attribute("background_color", color=True)
+	stroke_color = compact_attribute("stroke_color", color=True)
+
+	def __init__(self, store: UIViewStore, id):
+		self.store = store
+		self.id = id
+
+	def next_responder(self) -> UIResponder:
+		return self.store
+
+	def mouse_down(self, arg):
+		if self.store.view_action is None:
+			super().mouse_down(arg)
+		else:
+			self.store.view_action(self)
+
+	def enclosing_scroll_view(self) -> UIScrollView:
+		return self.store.enclosing_scroll_view()
+
+	def remove_from_superview(self):
+		self.store.remove_view(self)
+
+
+class UIViewStore(UIView):
+
+	# plain views of large scripted screens kept in typed arrays indexed by view id, instead of an object and shapes each
+	# views are UICompactView handles, store draws all of them with one command and moves, hits and sends them in passes over columns
+	# views outside frame of store draw and take presses too, like subviews which are not clipped
+	# views outside window and clip view are culled, their quads are not sent
+	view_action: callable = None
+	columns = {"x": "f", "y": "f", "width": "f", "height": "f", "stroke_width": "f", "opacity": "f", "background_color": "I", "stroke_color": "I"}
+
+	def __init__(self, x=0, y=0, width=0, height=0, background_color: UIColor = UIColor("000000"), stroke_color: UIColor = UIColor("000000"), stroke_width=0, opacity=100):
+		super().__init__(x, y, width, height, background_color, stroke_color, stroke_width, opacity)
+		self.values = {name: array.array(code) for name, code in self.columns.items()}
+		# handles by id, None at ids of removed views which are given to views added next
+		self.views: list[UICompactView] = []
+		self.free: list[int] = []
+		# ids whose quads are sent on next draw, and area they covered before
+		self.changed: set[int] = set()
+		self.damage = None
+		# quads renderer has, 5 per view like background and stroke lines of UIView
+		self.quad_count = 0
+		# ids whose quads renderer has, and area views were culled to when store was displayed
+		self.sent: set[int] = set()
+		self.visible = None
+
+	def add_view_target(self, action, event: UIEvent):
+		# one action for all views of store, unlike add_target of UIButton it gets pressed view instead of an arg
+		if event is UIEvent.press:
+			self.view_action = action
+
+	def add_view(self, x=0, y=0, width=0, height=0, background_color: UIColor = UIColor("000000"), stroke_color: UIColor = UIColor("000000"), stroke_width=0, opacity=100) -> UICompactView:
+		# frame is relative to store, like frame of a subview
+		row = (self.x + x, self.y + y, width, height, stroke_width, opacity, pack_color(background_color), pack_color(stroke_color))
+		if self.free:
+			id = self.free.pop()
+			self.will_change(id)
+			for column, value in zip(self.values.values(), row):
+				column[id] = value
+		else:
+			id = len(self.views)
+			for column, value in zip(self.values.values(), row):
+				column.append(value)
+			self.views.append(None)
+			self.changed.add(id)
+		view = self.views[id] = UICompactView(self, id)
+		return view
+
+	def remove_view(self, view: UICompactView):
+		# empty frame at origin of store until id is reused
+		self.will_change(view.id)
+		for name, value in (("x", self.x), ("y", self.y), ("width", 0), ("height", 0), ("stroke_width", 0)):
+			self.values[name][view.id] = value
+		self.views[view.id] = None
+		self.free.append(view.id)
+
+	def update(self, id, name, value):
+		column = self.values[name]
+		if column[id] != value:
+			self.will_change(id)
+			column[id] = value
+
+	def will_change(self, id):
+		# area view covers now is redrawn with it
+		bounds = self.view_bounds(id)
+		self.damage = union_rect(self.damage, bounds) if self.damage else bounds
+		self.changed.add(id)
+		if self.window is not None:
+			self.window.wake()
+
+	def view_bounds(self, id):
+		values = self.values
+		x, y, stroke = values["x"][id], values["y"][id], values["stroke_width"][id]
+		return (x - stroke, y - stroke, x + values["width"][id] + stroke, y + values["height"][id] + stroke)
+
+	def bounds(self):
+		values = self.values
+		if not self.views:
+			return super().bounds()
+		stroke = max(values["stroke_width"])
+		views = (min(values["x"]) - stroke, min(values["y"]) - stroke, max(map(operator.add, values["x"], values["width"])) + stroke, max(map(operator.add, values["y"], values["height"])) + stroke)
+		return union_rect(super().bounds(), views)
+
+	def hit_rect(self):
+		return self.bounds()
+
+	def move_by(self, dx, dy):
+		super().move_by(dx, dy)
+		# one pass over columns instead of one call per view
+		values = self.values
+		values["x"] = array.array("f", (x + dx for x in values["x"]))
+		values["y"] = array.array("f", (y + dy for y in values["y"]))
+
+	def responder_at(self, x, y) -> UIResponder:
+		# views of higher ids are drawn over lower ones
+		values = self.values
+		count = len(self.views)
+		columns = (reversed(values[name]) for name in ("x", "y", "width", "height"))
+		for id, left, bottom, width, height in zip(range(count - 1, -1, -1), *columns):
+			if left <= x <= left + width and bottom <= y <= bottom + height and self.views[id] is not None:
+				return self.views[id]
+		return self
+
+	def visible_rect(self):
+		# (left, bottom, right, top) of window inside clip view, None when nothing is visible
+		rect = (0, 0, self.window.width, self.window.height)
+		if self.clip is not None:
+			clip = self.clip.clip_rect()
+			return clip and intersect_rect(rect, clip)
+		return rect
+
+	def display(self, renderer: UIRenderer, background=True):
+		super().display(renderer, background)
+		self.visible = self.visible_rect()
+		self.display_views(renderer, range(len(self.views)))
+
+	def display_views(self, renderer: UIRenderer, ids):
+		# background and stroke lines of views as quads, from columns in one pass
+		if len(self.views) * 5 != self.quad_count:
+			ids = range(len(self.views))
+			# renderer makes new quads, they are transparent until sent
+			self.sent.clear()
+		sent = self.sent
+		# nothing is inside an empty area
+		left, bottom, right, top = self.visible or (math.inf, math.inf, -math.inf, -math.inf)
+		values = self.values
+		rects = array.array("f")
+		colors = array.array("B")
+		indices = []
+		columns = list(values.values())
+		rows = zip(*columns) if isinstance(ids, range) else (tuple(column[id] for column in columns) for id in ids)
+		for id, (x, y, width, height, stroke, opacity, background, stroke_color) in zip(ids, rows):
+			if not (left < x + width + stroke and x - stroke < right and bottom < y + height + stroke and y - stroke < top):
+				# culled, quads it was drawn with are emptied
+				if id in sent:
+					sent.discard(id)
+					indices.extend(range(id * 5, id * 5 + 5))
+					rects.extend((x, y, x, y) * 5)
+					colors.extend(bytes(20))
+				continue
+			sent.add(id)
+			indices.extend(range(id * 5, id * 5 + 5))
+			rects.extend((
+				x, y, x + width, y + height,
+				x - stroke, y, x, y + height + stroke,
+				x, y + height, x + width + stroke, y + height + stroke,
+				x + width, y - stroke, x + width + stroke, y + height,
+				x - stroke, y - stroke, x + width, y,
+			))
+			background, stroke_color = background.to_bytes(4, "big"), stroke_color.to_bytes(4, "big")
+			if opacity != 100:
+				# like UIColor.get_rgba()
+				alpha = round(opacity / 100 * 255)
+				background, stroke_color = (*background[:3], alpha), (*stroke_color[:3], alpha)
+			colors.extend(background)
+			for _ in range(4):
+				colors.extend(stroke_color)
+		self.quad_count = len(self.views) * 5
+		renderer.quads(self, self.quad_count, indices, rects, colors)
+		self.changed.clear()
+
+	def draw(self, window: UIWindow):
+		if self.visible != self.visible_rect():
+			# clip view or window changed, views culled before may show now
+			self.needs_display = True
+		if self.needs_display:
+			# store itself changed or views were moved together, all views are sent again
+			super().draw(window)
+		elif self.changed:
+			ids = sorted(self.changed)
+			damage = functools.reduce(union_rect, map(self.view_bounds, ids))
+			if self.damage is not None:
+				damage = union_rect(damage, self.damage)
+			self.display_views(window.renderer, ids)
+			window.set_needs_display(damage)
+			self.displayed_bounds = union_rect(self.displayed_bounds, damage) if self.displayed_bounds else damage
+			registered = window.hit_grid.rects.get(self)
+			if self.user_interaction_enabled and (registered is None or union_rect(registered, damage) != registered[:4]):
+				# views which moved out of area taking presses grow it, it shrinks when whole store is displayed again
+				self.update_hit_rect(window, union_rect(registered, damage) if registered else damage)
+		self.damage = None
+
+	def discard(self):
+		super().discard()
+		self.quad_count = 0
+
+
+def ease_linear(t):
+	return t
+
+def ease_in(t):
+	return t * t * t
+
+def ease_out(t):
+	return 1 - (1 - t) ** 3
+
+def ease_in_out(t):
+	return 4 * t * t * t if t < 0.5 else 1 - (2 - 2 * t) ** 3 / 2
+
+
+class UITween:
+
+	def __init__(self, duration=0.25, easing: callable = ease_in_out):
+		self.duration = duration
+		self.easing = easing
+
+	def progress(self, elapsed):
+		# (progress from 0 to 1, finished)
+		if elapsed >= self.duration:
+			return 1.0, True
+		return self.easing(elapsed / self.duration), False
+
+
+class UISpring:
+
+	# damped spring of unit mass moving from 0 to 1, solved for time so it does not depend on frame rate
+	def __init__(self, stiffness=170.0, damping=26.0):
+		self.omega = math.sqrt(stiffness)
+		self.zeta = damping / (2 * self.omega)
+
+	def progress(self, elapsed):
+		omega, zeta = self.omega, self.zeta
+		if zeta < 1:
+			damped = omega * math.sqrt(1 - zeta * zeta)
+			envelope = math.exp(-zeta * omega * elapsed)
+			offset = envelope * (math.cos(damped * elapsed) + zeta * omega / damped * math.sin(damped * elapsed))
+		elif zeta == 1:
+			envelope = math.exp(-omega * elapsed)
+			offset = envelope * (1 + omega * elapsed)
+		else:
+			root = math.sqrt(zeta * zeta - 1)
+			fast, slow = -omega * (zeta + root), -omega * (zeta - root)
+			envelope = math.exp(slow * elapsed)
+			offset = (fast * envelope - slow * math.exp(fast * elapsed)) / (fast - slow)
+		if envelope < 0.001:
+			return 1.0, True
+		return 1 - offset, False
+
+
+class UIDecay:
+
+	# coasting after a flick, speed falls by rate per second, stops when less than half a pixel of distance is left
+	def __init__(self, rate=4.0, distance=1000.0):
+		self.rate = rate
+		self.distance = abs(distance)
+
+	def progress(self, elapsed):
+		left = math.exp(-self.rate * elapsed)
+		if left * self.distance < 0.5:
+			return 1.0, True
+		return 1 - left, False
+
+
+class UIAnimation:
+
+	def __init__(self, view: UIView, timing: UITween | UISpring, values: dict, completion: callable = None):
+		self.view = view
+		self.timing = timing
+		self.start = time.monotonic()
+		# attribute -> (from, to)
+		self.values = {name: (getattr(view, name), value) for name, value in values.items()}
+		self.completion = completion
+
+	def apply(self, progress):
+		dx = dy = 0
+		for name, (start, end) in self.values.items():
+			if isinstance(end, UIColor):
+				value = start.mix(end, progress)
+			else:
+				value = start + (end - start) * progress
+				if name == "opacity":
+					value = min(100, max(0, value))
+			# subviews are in window coordinates, they move along with position
+			if name == "x":
+				dx = value - self.view.x
+			elif name == "y":
+				dy = value - self.view.y
+			else:
+				setattr(self.view, name, value)
+		if dx or dy:
+			self.view.move_by(dx, dy)
+
+
+class UIAnimator:
+
+	# animations of all windows advance together at start of a frame, changed views update their retained shapes
+	def __init__(self):
+		self.animations: list[UIAnimation] = []
+
+	def animate(self, view: UIView, timing: UITween | UISpring, completion: callable = None, **values) -> UIAnimation:
+		# new animation of an attribute takes over from current value
+		self.cancel(view, *values)
+		animation = UIAnimation(view, timing, values, completion)
+		self.animations.append(animation)
+		if view.window is not None:
+			view.window.wake()
+		return animation
+
+	def tween(self, view: UIView, duration=0.25, easing: callable = ease_in_out, completion: callable = None, **values) -> UIAnimation:
+		return self.animate(view, UITween(duration, easing), completion, **values)
+
+	def spring(self, view: UIView, stiffness=170.0, damping=26.0, completion: callable = None, **values) -> UIAnimation:
+		return self.animate(view, UISpring(stiffness, damping), completion, **values)
+
+	def cancel(self, view: UIView, *names):
+		# attributes stay where animations left them, animations left with nothing to animate end without completion
+		for animation in self.animations:
+			if animation.view is view:
+				for name in names:
+					animation.values.pop(name, None)
+		self.animations = [animation for animation in self.animations if animation.values]
+
+	def animating(self, view: UIView, name) -> bool:
+		return any(animation.view is view and name in animation.values for animation in self.animations)
+
+	def step(self):
+		if not self.animations:
+			return
+		now = time.monotonic()
+		running = []
+		finished = []
+		for animation in self.animations:
+			progress, done = animation.timing.progress(now - animation.start)
+			animation.apply(progress)
+			(finished if done else running).append(animation)
+		self.animations = running
+		# completions may start new animations
+		for animation in finished:
+			if animation.completion is not None:
+				animation.completion()
+
+
+animator = UIAnimator()
+
+
+class UIAssetBundle:
+
+	# header, JSON table of contents, then entries aligned to 16 bytes from end of table
+	magic = b"LUMOSRES"
+	version = 1
+	header = struct.Struct("<8sII")
+	alignment = 16
+
+	def __init__(self, path):
+		self.file = open(path, "rb")
+		# private copy on write mapping, readers get views of its pages instead of copies
+		self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_COPY)
+		magic, version, size = self.header.unpack_from(self.data)
+		if magic != self.magic or version != self.version:
+			raise ValueError(f"{path} is not a version {self.version} bundle")
+		# name relative to resources -> {"offset", "size"} and "width", "height" of decoded images
+		self.entries: dict[str, dict] = json.loads(self.data[self.header.size:self.header.size + size])
+		self.start = self.aligned(self.header.size + size)
+
+	@classmethod
+	def aligned(cls, offset):
+		return -(-offset // cls.alignment) * cls.alignment
+
+	@classmethod
+	def build(cls, resources_path, path):
+		# PNGs are decoded to RGBA rows bottom to top like GL reads them back, fonts are kept as they are
+		entries, blobs, offset = {}, [], 0
+		for root, directories, files in os.walk(resources_path):
+			directories.sort()
+			for file in sorted(files):
+				source = os.path.join(root, file)
+				name = os.path.relpath(source, resources_path)
+				extension = os.path.splitext(file)[1].lower()
+				if extension == ".png":
+					# converting RGB data in python breaks channels, let GL convert it
+					image = pyglet.image.load(source).get_texture().get_image_data()
+					data = bytes(image.get_data("RGBA", image.width * 4))
+					entries[name] = {"width": image.width, "height": image.height}
+				elif extension in (".ttf", ".otf"):
+					with open(source, "rb") as f:
+						data = f.read()
+					entries[name] = {}
+				else:
+					continue
+				entries[name].update(offset=offset, size=len(data))
+				blobs.append(data)
+				offset = cls.aligned(offset + len(data))
+
+		table = json.dumps(entries, sort_keys=True).encode()
+		with open(path, "wb") as f:
+			f.write(cls.header.pack(cls.magic, cls.version, len(table)))
+			f.write(table)
+			start = cls.aligned(f.tell())
+			for name, data in zip(entries, blobs):
+				f.seek(start + entries[name]["offset"])
+				f.write(data)
+		print(f"BUNDLE {len(entries)} FILES, {os.path.getsize(path) // 1024} KIB")
+
+	def name(self, path):
+		return os.path.relpath(os.path.abspath(path), os.path.abspath(RESOURCES_PATH))
+
+	def contains(self, path):
+		return self.name(path) in self.entries
+
+	def files(self, directory, extensions) -> list[str]:
+		# paths of bundled files directly in directory, like glob would list them
+		prefix = self.name(directory)
+		return [os.path.join(directory, os.path.basename(name)) for name in self.entries if os.path.dirname(name) == prefix and os.path.splitext(name)[1].lower() in extensions]
+
+	def view(self, path) -> memoryview:
+		entry = self.entries[self.name(path)]
+		return memoryview(self.data)[self.start + entry["offset"]:self.start + entry["offset"] + entry["size"]]
+
+	def buffer(self, path, type=ctypes.c_ubyte) -> ctypes.Array:
+		# ctypes array over the mapping, no bytes are copied
+		entry = self.entries[self.name(path)]
+		return (type * entry["size"]).from_buffer(self.data, self.start + entry["offset"])
+
+	def image(self, path) -> pyglet.image.ImageData:
+		entry = self.entries[self.name(path)]
+		return pyglet.image.ImageData(entry["width"], entry["height"], "RGBA", self.buffer(path), entry["width"] * 4)
+
+	def add_font(self, path):
+		font_class = pyglet.font._system_font_class
+		if hasattr(font_class, "_memory_faces"):
+			# FreeType reads a face from memory it is given and keeps it, give it the mapping instead of a copy
+			from pyglet.font.freetype import FreeTypeFace, FreeTypeMemoryFace
+			face = FreeTypeMemoryFace.__new__(FreeTypeMemoryFace)
+			face.font_data = self.buffer(path, ctypes.c_char)
+			FreeTypeFace.__init__(face, face._create_font_face())
+			font_class._memory_faces.add(face)
+		else:
+			pyglet.font.add_file(io.BytesIO(self.buffer(path)))
+
+
+asset_bundle = UIAssetBundle(BUNDLE_PATH) if os.path.exists(BUNDLE_PATH) else None
+
+
+def load_image(path) -> pyglet.image.AbstractImage:
+	if asset_bundle is not None and asset_bundle.contains(path):
+		return asset_bundle.image(path)
+	return pyglet.image.load(path)
+
+
+class UIImageCache:
+
+	# PNGs are decoded by worker threads, one core is left for main thread
+	# which creates textures for at most upload_budget seconds per frame
+	decode_workers = max(1, min(4, (os.cpu_count() or 2) - 1))
+	upload_budget = 0.004
+
+	def __init__(self, budget=IMAGE_CACHE_BUDGET):
+		self.budget = budget
+		self.size = 0
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		# path -> [texture, size in bytes, number of images using it], oldest first
+		self.textures: OrderedDict[str, list] = OrderedDict()
+		self.executor = concurrent.futures.ThreadPoolExecutor(self.decode_workers, thread_name_prefix="image")
+		# path -> decode in progress, and views to redisplay when it is uploaded, kept until texture is first acquired
+		self.loading: dict[str, concurrent.futures.Future] = {}
+		self.waiting: dict[str, weakref.WeakSet[UIView]] = {}
+		self.failed: set[str] = set()
+		self.uploader: UITimer = None
+
+	def acquire(self, path) -> pyglet.image.Texture:
+		# None until texture is uploaded, or for good when image can't be loaded
+		entry = self.textures.get(path)
+		if entry is None:
+			if path not in self.loading and path not in self.failed:
+				self.load(path)
+			if path not in self.textures:
+				return None
+			entry = self.textures[path]
+		else:
+			self.hits += 1
+			self.textures.move_to_end(path)
+		entry[2] += 1
+		self.waiting.pop(path, None)
+		self.evict()
+		return entry[0]
+
+	def load(self, path):
+		self.misses += 1
+		if asset_bundle is not None and asset_bundle.contains(path):
+			# bundled images are decoded already
+			self.add(path, asset_bundle.image(path))
+			return
+		self.loading[path] = self.executor.submit(self.decode, path)
+		if self.uploader is None:
+			self.uploader = scheduler.interval(self.upload, UIWindow.frame_interval)
+
+	@staticmethod
+	def decode(path) -> pyglet.image.ImageData:
+		# runs in a worker, rows are flipped here too so upload only copies them to GL
+		image = pyglet.image.load(path).get_image_data()
+		pitch = abs(image.pitch)
+		return pyglet.image.ImageData(image.width, image.height, image.format, image.get_data(image.format, pitch), pitch)
+
+	def add(self, path, image: pyglet.image.AbstractImage):
+		texture = image.get_texture()
+		self.textures[path] = [texture, texture.width * texture.height * 4, 0]
+		self.size += self.textures[path][1]
+
+	def notify(self, view: UIView, path):
+		# view is redisplayed when its image is uploaded
+		if path in self.loading:
+			self.waiting.setdefault(path, weakref.WeakSet()).add(view)
+
+	def upload(self):
+		deadline = time.perf_counter() + self.upload_budget
+		for path, future in list(self.loading.items()):
+			if time.perf_counter() >= deadline:
+				break
+			if not future.done():
+				continue
+			del self.loading[path]
+			try:
+				self.add(path, future.result())
+			except Exception as error:
+				print(f"IMAGE NOT LOADED! {path}: {error}")
+				self.failed.add(path)
+				self.waiting.pop(path, None)
+			for view in self.waiting.get(path, ()):
+				view.set_needs_display()
+		self.evict()
+		if not self.loading:
+			self.uploader.cancel()
+			self.uploader = None
+
+	def release(self, path):
+		entry = self.textures.get(path)
+		if entry is not None:
+			entry[2] -= 1
+			self.evict()
+
+	def evict(self):
+		# textures used by images on screen are never evicted, nor uploaded ones views wait for
+		for path in list(self.textures):
+			if self.size <= self.budget:
+				break
+			texture, size, users = self.textures[path]
+			if users == 0 and not self.waiting.get(path):
+				del self.textures[path]
+				self.waiting.pop(path, None)
+				self.size -= size
+				self.evictions += 1
+				texture.delete()
+
+
+image_cache = UIImageCache()
+
+
+class UIImageAtlas:
+
+	def __init__(self, directory, max_size=512, texture_size=1024):
+		self.directory = directory
+		# larger images get own textures from UIImageCache
+		self.max_size = max_size
+		self.texture_size = texture_size
+		# normalized path -> region of atlas texture, packed on first lookup
+		self.regions: dict[str, pyglet.image.TextureRegion] = None
+
+	def build(self):
+		self.regions = {}
+		textures = pyglet.image.atlas.TextureBin(self.texture_size, self.texture_size)
+		paths = asset_bundle.files(self.directory, (".png",)) if asset_bundle is not None else glob.glob(f"{self.directory}/*.png")
+		for path in sorted(paths):
+			image = load_image(path)
+			if image.width <= self.max_size and image.height <= self.max_size:
+				# blank border keeps neighbours from bleeding into scaled images
+				self.regions[os.path.normpath(path)] = textures.add(image, border=1)
+		if profiler is not None:
+			print(f"ATLAS {len(self.regions)} IMAGES IN {len(textures.atlases)} TEXTURES")
+
+	def region(self, path) -> pyglet.image.TextureRegion:
+		if self.regions is None:
+			self.build()
+		return self.regions.get(os.path.normpath(path))
+
+	def uv(self, path):
+		# (u0, v0, u1, v1) of image in its atlas texture, None when image is not in atlas
+		region = self.region(path)
+		if region is None:
+			return None
+		coords = region.tex_coords
+		return (coords[0], coords[1], coords[6], coords[7])
+
+
+image_atlas = UIImageAtlas(f"{RESOURCES_PATH}/images")
 
 
 class UIImage(UIView):
 
-	# TODO: background color is not supported
+	user_interaction_enabled = False
+	display_attributes = UIView.display_attributes | {"path"}
+
 	def __init__(self, x, y, width, height, path="", background_color = UIColor("000000")):
 		super().__init__(x, y, width, height, background_color=background_color)
-		# !!! Force running from directory upper than build. <./build/app>
-		# self.path = f"{os.getcwd()}/{path}"
 		self.path = path
 
-	def draw(self, batch):
-		try:
-			image = pyglet.image.load(self.path)
-			image.x = self.x
-			image.y = self.y
-			image.width = self.width
-			image.height = self.height
-			image.blit(image.x, image.y)
-		except FileNotFoundError:
-			super().draw(batch)
+	def display(self, renderer: UIRenderer):
+		# background is a placeholder while image loads and a fallback for images which can't be loaded
+		drawn = renderer.image(self, self.path, (self.x, self.y, self.width, self.height), self.opacity)
+		if not drawn:
+			image_cache.notify(self, self.path)
+		super().display(renderer, background=not drawn)
 
 
 class UIControl(UIView):
 	pass
 
 
+def font_names(read: callable) -> set[str]:
+	# lowercase family, full and typographic family names from name table, read(offset, size) returns bytes of font file
+	tables, = struct.unpack(">H", read(4, 2))
+	for i in range(tables):
+		tag, _, offset, length = struct.unpack(">4sIII", read(12 + i * 16, 16))
+		if tag == b"name":
+			break
+	else:
+		return set()
+	table = read(offset, length)
+	_, records, strings = struct.unpack_from(">HHH", table)
+	names = set()
+	for i in range(records):
+		platform, _, _, name_id, size, start = struct.unpack_from(">6H", table, 6 + i * 12)
+		if name_id in (1, 4, 16):
+			# unicode and windows names are UTF-16, mac roman is close enough to latin-1 for font names
+			raw = bytes(table[strings + start:strings + start + size])
+			names.add((raw.decode("utf-16-be") if platform in (0, 3) else raw.decode("latin-1")).lower())
+	return names
+
+
+class UIFontRegistry:
+
+	# pre-rasterized for every registered size up to full_set_size, larger sizes only get glyphs of their texts
+	glyph_set = string.ascii_letters + string.digits + string.punctuation + " «»№" + "".join(map(chr, range(0x410, 0x450))) + "Ёё"
+	full_set_size = 100
+	# glyphs rasterized per deferred call
+	warm_chunk = 8
+
+	def __init__(self, directories: list[str]):
+		self.directories = directories
+		# lowercase font name -> .ttf paths which have it, read once from name tables
+		self.paths: dict[str, list[str]] = None
+		self.loaded: set[str] = set()
+		self.fonts: dict[str, UIFont] = {}
+		# (font name, size, style) -> characters to rasterize ahead, and pyglet fonts kept so their glyphs are not dropped
+		self.sizes: dict[tuple, set[str]] = {}
+		self.faces: dict[tuple, pyglet.font.base.Font] = {}
+		self.warming = False
+
+	def index(self):
+		self.paths = {}
+		for directory in self.directories:
+			bundled = asset_bundle.files(directory, (".ttf",)) if asset_bundle is not None else []
+			for path in bundled:
+				view = asset_bundle.view(path)
+				for name in font_names(lambda offset, size: view[offset:offset + size]):
+					self.paths.setdefault(name, []).append(path)
+			if bundled or not os.path.isdir(directory):
+				continue
+			for path in sorted(glob.glob(f"{directory}/*.ttf")):
+				with open(path, "rb") as f:
+					def read(offset, size):
+						f.seek(offset)
+						return f.read(size)
+					for name in font_names(read):
+						self.paths.setdefault(name, []).append(path)
+
+	def load(self, name) -> bool:
+		# adds files having the name to pyglet once, False when neither they nor system fonts have it
+		key = name.lower()
+		if key in self.loaded:
+			return True
+		with startup_trace.phase("fonts"):
+			if self.paths is None:
+				self.index()
+			for path in self.paths.get(key, ()):
+				if asset_bundle is not None and asset_bundle.contains(path):
+					asset_bundle.add_font(path)
+				else:
+					pyglet.font.add_file(path)
+				self.loaded.add(key)
+			return key in self.loaded or pyglet.font.have_font(name)
+
+	def register(self, name, size, style: UITextStyle, text=""):
+		characters = self.sizes.setdefault((name, size, style), set())
+		characters.update(text)
+		if size <= self.full_set_size:
+			characters.update(self.glyph_set)
+		if self.warming:
+			scheduler.defer(functools.partial(self.warm_size, (name, size, style)))
+
+	def face(self, name, size, style: UITextStyle) -> pyglet.font.base.Font:
+		# same arguments pyglet.text.Label loads its font with, so labels get this font from pyglet cache
+		key = (name, size, style)
+		face = self.faces.get(key)
+		if face is None:
+			with startup_trace.phase("fonts"):
+				face = self.faces[key] = pyglet.font.load(name, size, bold=style is UITextStyle.bold, italic=style is UITextStyle.italic)
+		return face
+
+	def warm(self):
+		# rasterize glyphs of registered sizes in small steps between frames, before screens need them
+		self.warming = True
+		for key in list(self.sizes):
+			scheduler.defer(functools.partial(self.warm_size, key))
+
+	def warm_size(self, key):
+		face = self.face(*key)
+		missing = "".join(sorted(character for character in self.sizes[key] if character not in face.glyphs))
+		for i in range(0, len(missing), self.warm_chunk):
+			scheduler.defer(functools.partial(face.get_glyphs, missing[i:i + self.warm_chunk]))
+
+
+font_registry = UIFontRegistry([f"{RESOURCES_PATH}/fonts/Aristotelica Small Caps", f"{RESOURCES_PATH}/fonts/Gabriely"])
+
+
 class UIFont(UIObject):
 
+	# one instance per name, fonts are loaded by UIFontRegistry on first use of their name
+	def __new__(cls, name):
+		font = font_registry.fonts.get(name)
+		if font is None:
+			font = font_registry.fonts[name] = super().__new__(cls)
+		return font
+
 	def __init__(self, name):
 		self.name = name
-		pyglet.font.add_directory(f"{RESOURCES_PATH}/fonts/Aristotelica Small Caps")
-		pyglet.font.add_directory(f"{RESOURCES_PATH}/fonts/Gabriely")
-		if not pyglet.font.have_font("Aristotelica Small Caps"):
+		if not font_registry.load(name):
 			print("FONT NOT LOADED!")
 			exit(1)
 
@@ -278,9 +2353,78 @@ class UITextStyle(Enum):
 	stretch="stretch"
 
 
+class UITextLayout:
+
+	# word wrapped lines of one text, paragraphs keep their lines until they change
+	def __init__(self):
+		# (font name, size, style, width) lines were wrapped for
+		self.key = None
+		self.paragraphs: list[str] = []
+		# (text, width) of lines of every paragraph
+		self.lines: list[list[tuple[str, float]]] = []
+		# paragraphs wrapped by last update
+		self.wrapped = 0
+
+	@staticmethod
+	def measure(face: pyglet.font.base.Font, text) -> float:
+		return sum(glyph.advance for glyph in face.get_glyphs(text))
+
+	def update(self, text, font_name, font_size, style: UITextStyle, width) -> list[tuple[str, float]]:
+		face = font_registry.face(font_name, font_size, style)
+		key = (font_name, font_size, style, width)
+		if key != self.key:
+			self.key = key
+			self.paragraphs = []
+			self.lines = []
+		# only paragraphs between unchanged ones at start and end of text are wrapped again
+		paragraphs = text.split("\n")
+		old = self.paragraphs
+		common = min(len(old), len(paragraphs))
+		head = 0
+		while head < common and old[head] == paragraphs[head]:
+			head += 1
+		tail = 0
+		while tail < common - head and old[-1 - tail] == paragraphs[-1 - tail]:
+			tail += 1
+		changed = paragraphs[head:len(paragraphs) - tail]
+		self.lines[head:len(old) - tail] = [self.wrap(paragraph, face, width) for paragraph in changed]
+		self.paragraphs = paragraphs
+		self.wrapped = len(changed)
+		return [line for lines in self.lines for line in lines]
+
+	@staticmethod
+	def wrap(paragraph, face: pyglet.font.base.Font, width) -> list[tuple[str, float]]:
+		# breaks at last space which fits, words longer than width are broken anywhere
+		clusters = pyglet.font.base.get_grapheme_clusters(paragraph)
+		advances = [glyph.advance for glyph in face.get_glyphs(paragraph)]
+		lines = []
+		start = 0
+		line_width = 0
+		space = None
+		for i, advance in enumerate(advances):
+			if clusters[i] == " ":
+				space, space_width = i, line_width
+			line_width += advance
+			if line_width > width and clusters[i] != " " and i > start:
+				if space is not None:
+					lines.append(("".join(clusters[start:space]), space_width))
+					start = space + 1
+				else:
+					lines.append(("".join(clusters[start:i]), line_width - advance))
+					start = i
+				space = None
+				line_width = sum(advances[start:i + 1])
+		lines.append(("".join(clusters[start:]), line_width))
+		return lines
+
+
 class UIText(UIView):
 
-	def __init__(self, x, y, width, height, font: UIFont, font_size: int, text="", h_align: UIHorizonalTextAlignment=UIHorizonalTextAlignment.left, v_align: UIVerticalTextAlignment=UIVerticalTextAlignment.center, style: UITextStyle = UITextStyle.regular,  text_color: UIColor = UIColor("000000"), background_color: UIColor = UIColor("000000"), stroke_color: UIColor = UIColor("000000"), stroke_width=0, opacity=100, text_padding=0):
+	user_interaction_enabled = False
+	display_attributes = UIView.display_attributes | {"text", "style", "font", "font_size", "text_color", "h_align", "v_align", "text_padding", "wrap"}
+
+	# wrapped text is laid out in lines across width, auto sized text changes its frame to fit text with its top left corner in place
+	def __init__(self, x, y, width, height, font: UIFont, font_size: int, text="", h_align: UIHorizonalTextAlignment=UIHorizonalTextAlignment.left, v_align: UIVerticalTextAlignment=UIVerticalTextAlignment.center, style: UITextStyle = UITextStyle.regular,  text_color: UIColor = UIColor("000000"), background_color: UIColor = UIColor("000000"), stroke_color: UIColor = UIColor("000000"), stroke_width=0, opacity=100, text_padding=0, wrap=False, auto_size=False):
 		self.text = text
 		self.style = style
 		self.font = font
@@ -290,15 +2434,47 @@ class UIText(UIView):
 		self.h_align = h_align
 		self.v_align = v_align
 		self.text_padding = text_padding # horizonal
-		# TODO: move to UIView
-		self.drawing = None
+		self.wrap = wrap
+		self.auto_size = auto_size
+		self.layout = UITextLayout()
+		# (left, bottom, right, top) of drawn text
+		self.text_bounds = None
 		super().__init__(x, y, width, height, background_color, stroke_color, stroke_width, opacity)
+		font_registry.register(font.name, font_size, style, text)
+
+	def line_height(self):
+		face = font_registry.face(self.font.name, self.font_size, self.style)
+		return face.ascent - face.descent
+
+	def lines(self) -> list[tuple[str, float]]:
+		return self.layout.update(self.text, self.font.name, self.font_size, self.style, self.width - 2 * self.text_padding)
+
+	def size_to_fit(self):
+		# wrapped text keeps its width
+		if self.wrap:
+			height = len(self.lines()) * self.line_height()
+		else:
+			self.width = UITextLayout.measure(font_registry.face(self.font.name, self.font_size, self.style), self.text) + 2 * self.text_padding
+			height = self.line_height()
+		self.y += self.height - height
+		self.height = height
 
-	def draw(self, batch):
-		# info(f"DRAW UIText {self.x, self.y, self.width, self.height}, {self.background_color.rgba}")
-		if self.drawing is not None: self.drawing()
-		super().draw(batch)
-
+	def line_runs(self):
+		lines = self.lines()
+		line_height = self.line_height()
+		height = len(lines) * line_height
+		top = self.y + self.height
+		if self.v_align == UIVerticalTextAlignment.center:
+			top = self.y + (self.height + height) / 2
+		if self.v_align == UIVerticalTextAlignment.bottom:
+			top = self.y + height
+		x = self.text_position()[0]
+		# lines outside of window get no labels
+		first = max(0, int((top - (self.window.height if self.window is not None else top)) // line_height))
+		last = min(len(lines), math.ceil(top / line_height))
+		return [(text, (x, round(top - i * line_height))) for i, (text, width) in enumerate(lines[first:last], first) if text]
+
+	def text_position(self):
 		text_x = self.x
 		if self.h_align == UIHorizonalTextAlignment.left:
 			text_x = self.x + self.text_padding
@@ -312,23 +2488,287 @@ class UIText(UIView):
 			text_y = self.y + self.height
 		if self.v_align == UIVerticalTextAlignment.center:
 			text_y = self.y + self.height // 2.1
+		return text_x, text_y
+
+	def bounds(self):
+		# text may be drawn outside of the view
+		if self.text_bounds is None:
+			return super().bounds()
+		return union_rect(super().bounds(), self.text_bounds)
+
+	def display(self, renderer: UIRenderer):
+		# info(f"DRAW UIText {self.x, self.y, self.width, self.height}, {self.background_color.rgba}")
+		if self.auto_size:
+			self.size_to_fit()
+		super().display(renderer)
+		color = self.text_color.get_rgba(opacity=self.opacity)
+		if self.wrap:
+			self.text_bounds = renderer.lines(self, self.line_runs(), self.font.name, self.font_size, self.style, self.h_align, color)
+		else:
+			self.text_bounds = renderer.text(self, self.text, self.font.name, self.font_size, self.style, self.h_align, self.v_align, self.text_position(), color)
 
-		pyglet.text.Label(self.text, font_name=self.font.name, bold=True if self.style is UITextStyle.bold else False, italic=True if self.style is UITextStyle.italic else False, font_size=self.font_size, x=text_x, y=text_y,
-						  anchor_y=self.v_align.value, anchor_x=self.h_align.value, color=self.text_color.get_rgba(opacity=self.opacity)).draw()
+	def discard(self):
+		self.text_bounds = None
+		super().discard()
+
+
+class UILabelReuse:
+
+	# label of a text view is kept while it is laid out for the same text and style, it is not shared between views
+	# pyglet lays out labels again when they move to another batch or group, so a label pool keyed by text would not save that
+	def __init__(self):
+		self.hits = 0
+		self.rebuilds = 0
+		# labels rebuilt while UIWindow draws current frame
+		self.frame_rebuilds = 0
+		# label -> (text, font name, font size, style, h_align, v_align) it was laid out for
+		self.keys: dict[pyglet.text.Label, tuple] = {}
+
+	def update(self, label: pyglet.text.Label, key, position, color, batch, group):
+		if label is not None and self.keys[label] == key:
+			# same text and style, position and color are changed in place
+			self.hits += 1
+			if label.position[:2] != position:
+				label.position = (*position, 0)
+			if label.color != color:
+				label.color = color
+			return label
+
+		if label is not None and self.keys[label][1:] == key[1:] and label.batch is batch and label.group is group:
+			# only text changed, as in rows of a scrolled list, label is laid out again without making a new one
+			label.begin_update()
+			label.text = key[0]
+			label.position = (*position, 0)
+			label.color = color
+			label.end_update()
+			self.keys[label] = key
+			self.rebuilds += 1
+			self.frame_rebuilds += 1
+			return label
+
+		self.release(label)
+		text, font_name, font_size, style, h_align, v_align = key
+		font_registry.face(font_name, font_size, style)
+		label = pyglet.text.Label(text, font_name=font_name, bold=True if style is UITextStyle.bold else False, italic=True if style is UITextStyle.italic else False, font_size=font_size, x=position[0], y=position[1],
+								  anchor_y=v_align.value, anchor_x=h_align.value, color=color, batch=batch, group=group)
+		self.keys[label] = key
+		self.rebuilds += 1
+		self.frame_rebuilds += 1
+		return label
+
+	def release(self, label: pyglet.text.Label):
+		if label is not None:
+			del self.keys[label]
+			label.delete()
+
+
+label_reuse = UILabelReuse()
+profiler = UIProfiler(UI_PROFILE if UI_PROFILE.endswith(".json") else None) if UI_PROFILE else None
 
 # TODO: back uibutton with text
 class UIButton(UIView):
 
-	def add_target(self, action, event: UIEvent, arg):
+	action: callable = None
+	# builds controller passed as arg on first press, it is costly to create before it is shown
+	# released controller is not reused, next press builds a new one
+	factory: callable = None
+
+	def add_target(self, action, event: UIEvent, arg=None, factory: callable = None):
 		if event is UIEvent.press:
-			self.mouse_down = action
+			self.action = action
 			self.arg = arg
+			self.factory = factory
+
+	def mouse_down(self, arg):
+		if self.action is None:
+			super().mouse_down(arg)
+			return
+		if self.factory is not None and (arg is None or arg.released):
+			self.arg = arg = self.factory()
+		self.action(arg)
 
 
 class UITextInput(UIText):
 
-	def __init__(self, text, x, y, width, height, font: UIFont, h_align: UIHorizonalTextAlignment, v_align: UIVerticalTextAlignment, style: UITextStyle = UITextStyle.regular, text_color: UIColor = UIColor("000000"), background_color: UIColor = UIColor("000000"), opacity=100, text_padding=0):
-		super().__init__(text, x, y, width, height, font, h_align, v_align, style, text_color, background_color, opacity, text_padding)
+	user_interaction_enabled = True
+
+	# takes typing after it is pressed, text is edited at cursor and only edited paragraphs are laid out again
+	def __init__(self, x, y, width, height, font: UIFont, font_size: int, text="", h_align: UIHorizonalTextAlignment=UIHorizonalTextAlignment.left, v_align: UIVerticalTextAlignment=UIVerticalTextAlignment.top, style: UITextStyle = UITextStyle.regular, text_color: UIColor = UIColor("000000"), background_color: UIColor = UIColor("000000"), stroke_color: UIColor = UIColor("000000"), stroke_width=0, opacity=100, text_padding=0, wrap=True, auto_size=False):
+		super().__init__(x, y, width, height, font, font_size, text, h_align, v_align, style, text_color, background_color, stroke_color, stroke_width, opacity, text_padding, wrap, auto_size)
+		self.cursor = len(text)
+
+	def mouse_down(self, arg):
+		if self.window is not None:
+			self.window.first_responder = self
+
+	def insert_text(self, text):
+		font_registry.register(self.font.name, self.font_size, self.style, text)
+		self.text = self.text[:self.cursor] + text + self.text[self.cursor:]
+		self.cursor += len(text)
+
+	def delete_backward(self):
+		if self.cursor > 0:
+			self.text = self.text[:self.cursor - 1] + self.text[self.cursor:]
+			self.cursor -= 1
+
+
+class UIScrollView(UIView):
+
+	# subviews are content which is moved under the frame and clipped to it, by drags, flicks and mouse wheel
+	clips_to_bounds = True
+	# press turns into a drag after moving this far, wheel click scrolls by wheel_step
+	touch_slop = 10
+	wheel_step = 60
+	# flicks slower than min_velocity pixels per second don't coast
+	min_velocity = 100
+	deceleration = 4.0
+
+	def __init__(self, x=0, y=0, width=0, height=0, content_height=0, content_inset=0, scroll_indicator: UIView = None, background_color: UIColor = UIColor("000000"), stroke_color: UIColor = UIColor("000000"), stroke_width=0, opacity=100):
+		super().__init__(x, y, width, height, background_color, stroke_color, stroke_width, opacity)
+		self.content_height = content_height
+		# space between frame and content on every side
+		self.content_inset = content_inset
+		# distance content is scrolled up from its top
+		self._content_offset = 0
+		# view whose frame is the track, it is resized to show visible part of content
+		self.scroll_indicator = scroll_indicator
+		self.indicator_track = scroll_indicator and (scroll_indicator.y, scroll_indicator.height)
+		# view pressed, it gets the press on release unless touch became a drag
+		self.pressed: UIView = None
+		self.dragging = False
+		self.touch_start = 0
+		# (time, y) of last touch positions for flick velocity
+		self.touches: deque[tuple[float, float]] = deque(maxlen=8)
+		self.update_indicator()
+
+	@property
+	def content_offset(self):
+		return self._content_offset
+
+	@content_offset.setter
+	def content_offset(self, offset):
+		offset = min(max(0, offset), self.max_offset())
+		if offset != self._content_offset:
+			delta = offset - self._content_offset
+			self._content_offset = offset
+			self.scroll_content(delta)
+			self.update_indicator()
+
+	def max_offset(self):
+		return max(0, self.content_height + 2 * self.content_inset - self.height)
+
+	def scroll_content(self, delta):
+		for view in self.subviews:
+			view.move_by(0, delta)
+
+	def update_indicator(self):
+		if self.scroll_indicator is None:
+			return
+		track_y, track_height = self.indicator_track
+		content = self.content_height + 2 * self.content_inset
+		height = max(self.scroll_indicator.width, round(track_height * min(1, self.height / content))) if content else track_height
+		max_offset = self.max_offset()
+		travel = (track_height - height) * self.content_offset / max_offset if max_offset else 0
+		self.scroll_indicator.height = height
+		self.scroll_indicator.y = round(track_y + track_height - height - travel)
+
+	def display(self, renderer: UIRenderer, background=True):
+		super().display(renderer, background)
+		renderer.clip(self, self.clip_rect())
+
+	def touch_down(self, view: UIView, x, y):
+		# press on coasting content only stops it
+		self.pressed = None if animator.animating(self, "content_offset") else view
+		animator.cancel(self, "content_offset")
+		self.dragging = False
+		self.touch_start = y
+		self.touches.clear()
+		self.touches.append((time.perf_counter(), y))
+
+	def touch_moved(self, x, y):
+		if not self.dragging and abs(y - self.touch_start) >= self.touch_slop:
+			self.dragging = True
+			self.pressed = None
+		if self.dragging:
+			# content follows the touch
+			self.content_offset += y - self.touches[-1][1]
+			self.touches.append((time.perf_counter(), y))
+
+	def touch_up(self, x, y):
+		if self.pressed is not None:
+			self.pressed.mouse_down(self.pressed.arg)
+			self.pressed = None
+			return
+		if not self.dragging:
+			return
+		self.dragging = False
+		# velocity over last 0.1 seconds, touch which stopped before release doesn't coast
+		now = time.perf_counter()
+		recent = [(t, touch_y) for t, touch_y in self.touches if now - t <= 0.1]
+		if len(recent) < 2 or recent[-1][0] == recent[0][0]:
+			return
+		velocity = (recent[-1][1] - recent[0][1]) / (recent[-1][0] - recent[0][0])
+		if abs(velocity) < self.min_velocity:
+			return
+		target = min(max(0, self.content_offset + velocity / self.deceleration), self.max_offset())
+		animator.animate(self, UIDecay(self.deceleration, target - self.content_offset), content_offset=target)
+
+	def scroll_wheel(self, clicks):
+		animator.cancel(self, "content_offset")
+		self.content_offset -= clicks * self.wheel_step
+
+
+class UIListView(UIScrollView):
+
+	# count rows of row_height, only rows crossing the frame exist and they show other indices while scrolling
+	# make_row() returns a row at 0, 0, configure_row(row, index) sets it up for index
+	def __init__(self, x=0, y=0, width=0, height=0, count=0, row_height=40, row_spacing=0, make_row: callable = None, configure_row: callable = None, content_inset=0, scroll_indicator: UIView = None, background_color: UIColor = UIColor("000000"), stroke_color: UIColor = UIColor("000000"), stroke_width=0, opacity=100):
+		super().__init__(x, y, width, height, 0, content_inset, scroll_indicator, background_color, stroke_color, stroke_width, opacity)
+		self.row_height = row_height
+		self.row_spacing = row_spacing
+		self.make_row = make_row
+		self.configure_row = configure_row
+		self.count = 0
+		self.rows: list[UIView] = []
+		# index each row shows, row of index is rows[index % len(rows)]
+		self.indices: list[int] = []
+		self.reload(count)
+
+	def reload(self, count=None):
+		# all rows are configured again, for changed count or data
+		self.count = self.count if count is None else count
+		pitch = self.row_height + self.row_spacing
+		self.content_height = max(0, self.count * pitch - self.row_spacing)
+		rows = min(self.count, math.ceil(self.height / pitch) + 1)
+		while len(self.rows) > rows:
+			self.rows.pop().remove_from_superview()
+		while len(self.rows) < rows:
+			row = self.make_row()
+			row.move_by(self.content_inset, 0)
+			self.add_subview(row)
+			self.rows.append(row)
+		self.indices = [-1] * rows
+		# clamped to new content
+		self.content_offset = self.content_offset
+		self.layout()
+		self.update_indicator()
+
+	def scroll_content(self, delta):
+		self.layout()
+
+	def layout(self):
+		if not self.rows:
+			return
+		pitch = self.row_height + self.row_spacing
+		first = max(0, min(int((self.content_offset - self.content_inset) // pitch), self.count - len(self.rows)))
+		top = self.y + self.height - self.content_inset + self.content_offset
+		for index in range(first, first + len(self.rows)):
+			slot = index % len(self.rows)
+			row = self.rows[slot]
+			if self.indices[slot] != index:
+				self.indices[slot] = index
+				self.configure_row(row, index)
+			row.move_by(0, round(top - index * pitch - self.row_height) - row.y)
 
 
 gabriely_font = UIFont(
@@ -345,17 +2785,24 @@ gray_color = UIColor("525252")
 class BaseViewController(UIViewController):
 
 	def update_time(self):
-		from datetime import datetime
-		now = datetime.now()
-		formatted_datetime = now.strftime("%d.%m.%Y %H:%M")
-		self.date_time_text.text = formatted_datetime
+		self.date_time_text.text = time.strftime("%d.%m.%Y %H:%M")
 
 	def __init__(self):
 		super().__init__()
+		# chrome is the same on every screen and drawn once
+		self.header_view = UIView(
+			x = 0,
+			y = 1080 - 198,
+			width = 1920,
+			height = 198,
+			background_color=light_gray_color
+		)
+		self.header_view.rasterize = True
+
+		# subviews of header_view, y from its bottom
 		self.status_text = UIText(
 			x = 168,
-			# y = 872,
-			y = 1080 - 109 - 84,
+			y = 198 - 109 - 84,
 			width=1684,
 			height=109,
 			background_color=light_gray_color,
@@ -368,7 +2815,7 @@ class BaseViewController(UIViewController):
 
 		self.line1 = UIView(
 			x = 168,
-			y = 1080 - 3 - 183,
+			y = 198 - 3 - 183,
 			width=1704,
 			height=3,
 			background_color=UIColor("525252")
@@ -376,7 +2823,7 @@ class BaseViewController(UIViewController):
 
 		self.line2 = UIView(
 			x = 168,
-			y = 1080 - 3 - 188,
+			y = 198 - 3 - 188,
 			width=1704,
 			height=3,
 			background_color=UIColor("525252")
@@ -384,12 +2831,13 @@ class BaseViewController(UIViewController):
 
 		self.tab_bar_view = UIView(
 			x = 0,
-			y = 1030,
+			y = 198 - 50,
 			width = 1920,
 			height = 50,
 			background_color=UIColor("ABABAB")
 		)
 
+		# clock changes every minute, it is drawn over header_view instead of redrawing it
 		self.date_time_text = UIText(
 			text="06.08.2024 17:16",
 			x = 1486,
@@ -406,28 +2854,639 @@ class BaseViewController(UIViewController):
 
 		self.logo_image = UIImage(
 			x = 50,
-			y = 882,
+			y = 0,
 			width = 109,
 			height = 109,
 			path=f"{RESOURCES_PATH}/images/logo.png"
 		)
+		self.clock_timer: UITimer = None
 
 	def view_did_load(self):
-		self.date_time_text.drawing = self.update_time
-		self.view.add_subview(self.tab_bar_view)
+		self.header_view.add_subview(self.tab_bar_view)
+		self.header_view.add_subview(self.logo_image)
+		self.header_view.add_subview(self.status_text)
+		self.header_view.add_subview(self.line1)
+		self.header_view.add_subview(self.line2)
+		self.view.add_subview(self.header_view)
 		self.view.add_subview(self.date_time_text)
-		self.view.add_subview(self.logo_image)
-		self.view.add_subview(self.status_text)
-		self.view.add_subview(self.line1)
-		self.view.add_subview(self.line2)
 		self.view.background_color = light_gray_color
 
+	def view_will_appear(self):
+		# label only changes when minute does, and only while screen is shown
+		self.update_time()
+		if self.clock_timer is None:
+			self.clock_timer = scheduler.aligned(self.update_time, 60)
+
+	def view_did_disappear(self):
+		self.stop_clock()
+
+	def stop_clock(self):
+		if self.clock_timer is not None:
+			self.clock_timer.cancel()
+			self.clock_timer = None
+
+	def release(self):
+		self.stop_clock()
+		super().release()
+
+
+class UIWindowManager:
+
+	# external app windows, ids are strings as xdotool prints them
+	def spawn(self, command):
+		return subprocess.Popen(command)
+
+	def terminate(self, process):
+		if process is not None:
+			process.terminate()
+
+	# backends override what they can do, this one finds no windows and ignores the rest
+	def search(self, name) -> list[str]:
+		return []
+
+	def place(self, ids: list[str], x, y, width, height):
+		pass
+
+	def kill(self, ids: list[str]):
+		pass
+
+	def hide(self, ids: list[str]):
+		pass
+
+	def show(self, ids: list[str], x, y, width, height):
+		pass
+
+	def exists(self, ids: list[str]) -> bool:
+		return False
+
+	def reshow(self, ids: list[str], x, y, width, height) -> bool:
+		# shows windows of a pooled app again, False when they were closed from outside
+		if not self.exists(ids):
+			return False
+		self.show(ids, x, y, width, height)
+		return True
+
+	def memory(self, process) -> int:
+		# resident bytes of process and its children
+		if process is None:
+			return 0
+		if os.path.exists(f"/proc/{process.pid}/task/{process.pid}/children"):
+			children = self.listed_children
+		else:
+			tree = self.process_tree()
+			children = lambda pid: tree.get(pid, ())
+
+		size = 0
+		pids = [process.pid]
+		while pids:
+			pid = pids.pop()
+			try:
+				with open(f"/proc/{pid}/statm") as f:
+					size += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+			except OSError:
+				continue
+			pids.extend(children(pid))
+		return size
+
+	@staticmethod
+	def listed_children(pid) -> list[int]:
+		# kernel lists children of each thread, only files of the app's processes are read
+		pids = []
+		for path in glob.glob(f"/proc/{pid}/task/*/children"):
+			try:
+				with open(path) as f:
+					pids.extend(map(int, f.read().split()))
+			except OSError:
+				pass
+		return pids
+
+	@staticmethod
+	def process_tree() -> dict[int, list[int]]:
+		# pid -> child pids from stat of every process, for kernels built without children lists
+		children = {}
+		for stat_path in glob.glob("/proc/[0-9]*/stat"):
+			try:
+				with open(stat_path) as f:
+					stat = f.read()
+			except OSError:
+				continue
+			# command name is in parentheses and can contain spaces
+			pid, ppid = int(stat[:stat.index(" ")]), int(stat[stat.rindex(")") + 2:].split()[1])
+			children.setdefault(ppid, []).append(pid)
+		return children
+
+
+class UIXdotoolWindowManager(UIWindowManager):
+
+	# one chained xdotool process per operation for all windows of an app
+	def search(self, name) -> list[str]:
+		os.environ['DISPLAY'] = ':0'
+		result = subprocess.run(['xdotool', 'search', '--onlyvisible', '--name', name], stdout=subprocess.PIPE, text=True)
+		return result.stdout.split()
+
+	def place(self, ids: list[str], x, y, width, height):
+		command = ['xdotool']
+		for id in ids:
+			command += ['windowmove', id, str(x), str(y), 'windowsize', id, str(width), str(height)]
+		subprocess.run(command)
+
+	def kill(self, ids: list[str]):
+		command = ['xdotool']
+		for id in ids:
+			command += ['windowkill', id]
+		subprocess.run(command)
+
+	def hide(self, ids: list[str]):
+		command = ['xdotool']
+		for id in ids:
+			command += ['windowunmap', id]
+		subprocess.run(command)
+
+	def show(self, ids: list[str], x, y, width, height):
+		command = ['xdotool']
+		for id in ids:
+			command += ['windowmap', id, 'windowmove', id, str(x), str(y), 'windowsize', id, str(width), str(height)]
+		subprocess.run(command)
+
+	def exists(self, ids: list[str]) -> bool:
+		command = ['xdotool']
+		for id in ids:
+			command += ['getwindowname', id]
+		return subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+
+	def reshow(self, ids: list[str], x, y, width, height) -> bool:
+		# one chain checks all windows before mapping any, it stops at the first one which is gone
+		command = ['xdotool']
+		for id in ids:
+			command += ['getwindowname', id]
+		for id in ids:
+			command += ['windowmap', id, 'windowmove', id, str(x), str(y), 'windowsize', id, str(width), str(height)]
+		return subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+
+
+class UIXlibWindowManager(UIWindowManager):
+
+	# X connection kept open through pyglet's Xlib bindings, opened on first use
+	def __init__(self, display_name=":0"):
+		self.display_name = display_name
+		self.display = None
+
+	@staticmethod
+	def available(display_name=":0"):
+		try:
+			from pyglet.libs.x11 import xlib
+		except ImportError:
+			return False
+		display = xlib.XOpenDisplay(display_name.encode())
+		if not display:
+			return False
+		xlib.XCloseDisplay(display)
+		return True
+
+	def connect(self):
+		if self.display is None:
+			from pyglet.libs.x11 import xlib
+			self.xlib = xlib
+			display = xlib.XOpenDisplay(self.display_name.encode())
+			if not display:
+				raise OSError(f"cannot open X display {self.display_name}")
+			self.display = display
+			self.root = xlib.XDefaultRootWindow(display)
+			self.net_wm_name = xlib.XInternAtom(display, b"_NET_WM_NAME", False)
+			self.utf8_string = xlib.XInternAtom(display, b"UTF8_STRING", False)
+		return self.display
+
+	def title(self, window):
+		xlib = self.xlib
+		type, format, count, remaining = xlib.Atom(), ctypes.c_int(), ctypes.c_ulong(), ctypes.c_ulong()
+		data = ctypes.POINTER(ctypes.c_ubyte)()
+		xlib.XGetWindowProperty(self.display, window, self.net_wm_name, 0, 1024, False, self.utf8_string,
+			ctypes.byref(type), ctypes.byref(format), ctypes.byref(count), ctypes.byref(remaining), ctypes.byref(data))
+		if data:
+			title = ctypes.string_at(data, count.value).decode("utf-8", "replace")
+			xlib.XFree(data)
+			return title
+		name = ctypes.c_char_p()
+		if xlib.XFetchName(self.display, window, ctypes.byref(name)) and name.value is not None:
+			title = name.value.decode("latin-1")
+			xlib.XFree(ctypes.cast(name, ctypes.c_void_p))
+			return title
+		return None
+
+	def viewable(self, window):
+		attributes = self.xlib.XWindowAttributes()
+		return self.xlib.XGetWindowAttributes(self.display, window, ctypes.byref(attributes)) and attributes.map_state == self.xlib.IsViewable
+
+	def windows(self):
+		display = self.connect()
+		xlib = self.xlib
+		stack = [self.root]
+		while stack:
+			window = stack.pop()
+			yield window
+			root, parent = xlib.Window(), xlib.Window()
+			children = ctypes.POINTER(xlib.Window)()
+			count = ctypes.c_uint()
+			if xlib.XQueryTree(display, window, ctypes.byref(root), ctypes.byref(parent), ctypes.byref(children), ctypes.byref(count)):
+				stack.extend(children[i] for i in range(count.value))
+				if children:
+					xlib.XFree(children)
+
+	def search(self, name) -> list[str]:
+		ids = []
+		for window in self.windows():
+			title = self.title(window)
+			if title is not None and re.search(name, title) and self.viewable(window):
+				ids.append(str(window))
+		return ids
+
+	def place(self, ids: list[str], x, y, width, height):
+		display = self.connect()
+		for id in ids:
+			self.xlib.XMoveResizeWindow(display, int(id), x, y, width, height)
+		self.xlib.XFlush(display)
+
+	def kill(self, ids: list[str]):
+		display = self.connect()
+		for id in ids:
+			self.xlib.XKillClient(display, int(id))
+		self.xlib.XFlush(display)
+
+	def hide(self, ids: list[str]):
+		display = self.connect()
+		for id in ids:
+			self.xlib.XUnmapWindow(display, int(id))
+		self.xlib.XFlush(display)
+
+	def show(self, ids: list[str], x, y, width, height):
+		display = self.connect()
+		for id in ids:
+			self.xlib.XMapRaised(display, int(id))
+			self.xlib.XMoveResizeWindow(display, int(id), x, y, width, height)
+		self.xlib.XFlush(display)
+
+	def exists(self, ids: list[str]) -> bool:
+		# walk the tree instead of asking for each window, a missing one would raise an X error
+		return {int(id) for id in ids} <= set(self.windows())
+
+
+class UIFakeWindowManager(UIWindowManager):
+
+	# in memory windows for running without X, a spawned command gets a window after `searches` searches
+	def __init__(self, titles: dict[str, str] = None, searches=1, rss: dict[str, int] = None):
+		self.titles = titles or {}
+		self.searches = searches
+		# resident bytes reported for a command
+		self.rss = rss or {}
+		self.pending = []
+		self.windows = {}
+		self.calls = []
+		self.next_id = 1
+
+	def spawn(self, command):
+		self.calls.append(("spawn", *command))
+		self.pending.append([self.searches, self.titles.get(command[0], command[0])])
+		return command[0]
+
+	def terminate(self, process):
+		self.calls.append(("terminate", process))
+
+	def search(self, name) -> list[str]:
+		self.calls.append(("search", name))
+		for pending in list(self.pending):
+			pending[0] -= 1
+			if pending[0] <= 0:
+				self.pending.remove(pending)
+				self.windows[str(self.next_id)] = {"title": pending[1], "x": 0, "y": 0, "width": 0, "height": 0, "mapped": True}
+				self.next_id += 1
+		return [id for id, window in self.windows.items() if window["mapped"] and re.search(name, window["title"])]
+
+	def place(self, ids: list[str], x, y, width, height):
+		self.calls.append(("place", *ids))
+		for id in ids:
+			self.windows[id].update(x=x, y=y, width=width, height=height)
+
+	def kill(self, ids: list[str]):
+		self.calls.append(("kill", *ids))
+		for id in ids:
+			self.windows.pop(id, None)
+
+	def hide(self, ids: list[str]):
+		self.calls.append(("hide", *ids))
+		for id in ids:
+			self.windows[id]["mapped"] = False
+
+	def show(self, ids: list[str], x, y, width, height):
+		self.calls.append(("show", *ids))
+		for id in ids:
+			self.windows[id].update(x=x, y=y, width=width, height=height, mapped=True)
+
+	def exists(self, ids: list[str]) -> bool:
+		self.calls.append(("exists", *ids))
+		return all(id in self.windows for id in ids)
+
+	def memory(self, process) -> int:
+		return self.rss.get(process, 0)
+
+
+# chosen on first use, probing for an X display on import would slow down startup
+window_manager: UIWindowManager = None
+
+
+def get_window_manager() -> UIWindowManager:
+	global window_manager
+	if window_manager is None:
+		window_manager = UIXlibWindowManager() if UIXlibWindowManager.available() else UIXdotoolWindowManager()
+	return window_manager
+
+
+class UIWindowWorker:
+
+	# window manager calls run one after another in a thread, xdotool processes and X round trips don't hold up frames
+	# results are handed back on main thread, polled at frame interval like image uploads
+	def __init__(self):
+		self.executor = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="windows")
+		self.pending: list[tuple[concurrent.futures.Future, callable]] = []
+		self.poller: UITimer = None
+
+	def run(self, job: callable, done: callable = None, failed: callable = None) -> concurrent.futures.Future:
+		# job gets window manager, done gets what job returned and failed the error it raised
+		future = self.executor.submit(lambda: job(get_window_manager()))
+		if done is None and failed is None:
+			# nothing reads the result, errors are only logged
+			future.add_done_callback(self.log)
+		else:
+			self.pending.append((future, done, failed))
+			if self.poller is None:
+				self.poller = scheduler.interval(self.poll, UIWindow.frame_interval)
+		return future
+
+	@staticmethod
+	def log(future: concurrent.futures.Future):
+		if future.exception() is not None:
+			print(f"WINDOW MANAGER FAILED! {future.exception()}")
+
+	def poll(self):
+		pending, self.pending = self.pending, []
+		finished = []
+		for item in pending:
+			(finished if item[0].done() else self.pending).append(item)
+		if not self.pending:
+			self.poller.cancel()
+			self.poller = None
+		# callbacks may run new jobs, an error of one job doesn't stop the event loop or other callbacks
+		for future, done, failed in finished:
+			error = future.exception()
+			if error is None:
+				if done is not None:
+					done(future.result())
+			elif failed is not None:
+				failed(error)
+			else:
+				self.log(future)
+
+
+window_worker = UIWindowWorker()
+
+
+class UIAppLaunch:
+
+	# window searches back off from first_delay to max_delay seconds and give up after timeout
+	# searches run in window worker, next one is scheduled when result of previous one is back
+	first_delay = 0.1
+	max_delay = 1.0
+	timeout = 30.0
+
+	def __init__(self, command, app, on_window: callable, on_timeout: callable = None):
+		self.app = app
+		self.on_window = on_window
+		self.on_timeout = on_timeout
+		self.delay = self.first_delay
+		self.started = time.monotonic()
+		self.existing: set[str] = set()
+		self.process = None
+		window_worker.run(lambda manager: self.spawn(manager, command), self.searched, self.failed)
+
+	def spawn(self, manager: UIWindowManager, command) -> list[str]:
+		# windows of the app open before launching are not ours, new ones are not there yet
+		self.existing = set(manager.search(self.app))
+		self.process = manager.spawn(command)
+		return []
+
+	def poll(self, dt):
+		window_worker.run(lambda manager: manager.search(self.app), self.searched, self.failed)
+
+	def searched(self, ids: list[str]):
+		ids = [id for id in ids if id not in self.existing]
+		if ids:
+			self.on_window(ids)
+		elif time.monotonic() - self.started >= self.timeout:
+			print(f"{self.app} WINDOW NOT FOUND!")
+			if self.on_timeout is not None:
+				self.on_timeout()
+		else:
+			pyglet.clock.schedule_once(self.poll, self.delay)
+			self.delay = min(self.delay * 2, self.max_delay)
+
+	def failed(self, error):
+		# command or window manager tool is missing, searching again would fail the same way
+		print(f"{self.app} NOT LAUNCHED! {error}")
+		if self.on_timeout is not None:
+			self.on_timeout()
+
+
+class UIAppPolicy:
+
+	# keep_alive is seconds a hidden app stays open, None keeps it until memory runs short, 0 closes it on leave
+	def __init__(self, app, command, prelaunch=False, keep_alive=None, memory_limit=None):
+		self.app = app
+		self.command = command
+		self.prelaunch = prelaunch
+		self.keep_alive = keep_alive
+		self.memory_limit = memory_limit
+
+
+class UIPooledApp:
+
+	def __init__(self, policy: UIAppPolicy):
+		self.policy = policy
+		self.launch: UIAppLaunch = None
+		self.process = None
+		self.ids: list[str] = None
+		self.frame = None
+		self.visible = False
+		# closed while its window was still starting up
+		self.closing = False
+		# last launch failed or timed out, it is not launched again until the user opens the app
+		self.not_launched = False
+		self.hidden_at = time.monotonic()
+
+
+class UIAppPool:
+
+	# external apps stay open hidden when the user leaves them and are shown again on return
+	reap_interval = 5.0
+
+	def __init__(self, budget):
+		self.budget = budget
+		self.apps: dict[str, UIPooledApp] = {}
+		self.reaping = False
+		# memory of running apps is read in window worker
+		self.sampling = False
+
+	def register(self, policy: UIAppPolicy):
+		self.apps[policy.app] = UIPooledApp(policy)
+
+	def prelaunch(self):
+		for app in self.apps.values():
+			if app.policy.prelaunch and app.ids is None and app.launch is None and not app.not_launched:
+				self.start(app)
+		self.schedule_reap()
+
+	def start(self, app: UIPooledApp):
+		app.not_launched = False
+		app.launch = UIAppLaunch(app.policy.command, app.policy.app, lambda ids: self.found(app, ids), lambda: self.lost(app))
+
+	def found(self, app: UIPooledApp, ids):
+		app.process = app.launch.process
+		app.launch = None
+		app.ids = ids
+		if app.closing:
+			self.close(app)
+		elif app.visible:
+			frame = app.frame
+			window_worker.run(lambda manager: manager.place(ids, *frame))
+			self.log(app)
+		else:
+			window_worker.run(lambda manager: manager.hide(ids))
+
+	def lost(self, app: UIPooledApp):
+		# app which didn't show a window is stopped instead of running unseen, after its spawn if that is still queued
+		launch = app.launch
+		window_worker.run(lambda manager: manager.terminate(launch.process))
+		app.launch = None
+		app.process = None
+		app.closing = False
+		app.not_launched = True
+
+	def log(self, app: UIPooledApp):
+		x, y, width, height = app.frame
+		with open(f"{RESOURCES_PATH}/log", "w") as f:
+			for id in app.ids:
+				f.write(f"{app.policy.app} + {id}\n")
+				f.write(f"xdotool windowmove {id} {x} {y}\n")
+				f.write(f"xdotool windowsize {id} {width} {height}\n")
+				f.write(f"xdotool windowkill {id}\n")
+
+	def show(self, name, frame):
+		app = self.apps[name]
+		app.visible = True
+		app.closing = False
+		app.frame = frame
+		if app.ids is not None:
+			ids = app.ids
+			window_worker.run(lambda manager: manager.reshow(ids, *frame), lambda shown: self.shown(app, ids, shown), lambda error: self.not_shown(app, ids, error))
+		elif app.launch is None:
+			self.start(app)
+
+	def shown(self, app: UIPooledApp, ids, shown):
+		if shown:
+			if app.visible:
+				self.log(app)
+		elif app.ids is ids:
+			# closed from outside, launched again if it is still wanted
+			app.ids = app.process = None
+			if app.visible and app.launch is None:
+				self.start(app)
+
+	def not_shown(self, app: UIPooledApp, ids, error):
+		# window manager failed, app is stopped and left alone like one whose launch failed
+		print(f"{app.policy.app} NOT SHOWN! {error}")
+		if app.ids is ids:
+			process = app.process
+			window_worker.run(lambda manager: manager.terminate(process))
+			app.ids = app.process = None
+			app.not_launched = True
+
+	def hide(self, name):
+		app = self.apps[name]
+		app.visible = False
+		app.hidden_at = time.monotonic()
+		if app.policy.keep_alive == 0:
+			self.close(app)
+		elif app.ids is not None:
+			ids = app.ids
+			window_worker.run(lambda manager: manager.hide(ids))
+		self.schedule_reap()
+
+	def close(self, app: UIPooledApp):
+		if app.launch is not None:
+			# window is killed when it shows up
+			app.closing = True
+			return
+		if app.ids is not None:
+			ids = app.ids
+			window_worker.run(lambda manager: manager.kill(ids))
+		app.ids = app.process = None
+		app.closing = False
+
+	def schedule_reap(self):
+		if not self.reaping:
+			self.reaping = True
+			pyglet.clock.schedule_interval(self.reap, self.reap_interval)
+
+	def reap(self, dt):
+		# apps are closed when memory sampled in window worker comes back
+		if self.sampling:
+			return
+		self.sampling = True
+		running = [app for app in self.apps.values() if app.ids is not None]
+		processes = [app.process for app in running]
+		window_worker.run(lambda manager: [manager.memory(process) for process in processes], lambda sizes: self.trim(running, sizes))
+
+	def trim(self, running: list[UIPooledApp], sizes: list[int]):
+		self.sampling = False
+		now = time.monotonic()
+		# apps closed while memory was read are left out
+		memory = {app: size for app, size in zip(running, sizes) if app.ids is not None}
+		hidden = []
+		for app in memory:
+			if app.visible:
+				continue
+			keep_alive, memory_limit = app.policy.keep_alive, app.policy.memory_limit
+			if keep_alive is not None and now - app.hidden_at >= keep_alive or memory_limit is not None and memory[app] > memory_limit:
+				print(f"{app.policy.app} CLOSED")
+				self.close(app)
+				memory[app] = 0
+			else:
+				hidden.append(app)
+
+		# under memory pressure close least recently used hidden apps
+		hidden.sort(key=lambda app: app.hidden_at)
+		while hidden and sum(memory.values()) > self.budget:
+			app = hidden.pop(0)
+			print(f"{app.policy.app} CLOSED")
+			self.close(app)
+			memory[app] = 0
+
+		if not hidden and not any(app.launch for app in self.apps.values()):
+			self.reaping = False
+			pyglet.clock.unschedule(self.reap)
+
+
+app_pool = UIAppPool(APP_POOL_MEMORY_BUDGET)
+app_pool.register(UIAppPolicy("Thunderbird", ['thunderbird'], prelaunch=True))
+app_pool.register(UIAppPolicy("Home", ['nautilus', "/home/parallels/"], prelaunch=True, keep_alive=10 * 60))
+
 
 class AppViewContoller(BaseViewController):
 
+	# where launched app windows are placed
+	app_frame = (45, 284, 1830, 711)
+
 	def __init__(self):
 		super().__init__()
-		self.ids = None
+		self.app = None
 		self.back_button = UIButton(
 			x=45,
 			y=1080-196-72,
@@ -457,8 +3516,7 @@ class AppViewContoller(BaseViewController):
 			text="НАЗАД",
 			text_color=gray_color
 		)
-		# TODO: make with parent
-		self.back_button.add_target(action=self.present, event=UIEvent.press, arg=MainViewController())
+		self.back_button.add_target(action=self.dismiss, event=UIEvent.press, arg=None)
 
 	def view_did_load(self):
 		super().view_did_load()
@@ -466,39 +3524,26 @@ class AppViewContoller(BaseViewController):
 		self.view.add_subview(self.back_button_icon)
 		self.view.add_subview(self.back_button_text)
 
-	def present(self, view_controller: UIViewController):
-		self.kill_app()
-		super().present(view_controller)
+	def view_did_disappear(self):
+		super().view_did_disappear()
+		self.hide_app()
 
-	def run_app(self, command, app):
-		subprocess.Popen(command)
-		time.sleep(2)
-		os.environ['DISPLAY'] = ':0'
-		result = subprocess.run(['xdotool', 'search', '--name', app], stdout=subprocess.PIPE, text=True)
-		output = result.stdout.strip()
-		window_ids = output.splitlines()
-		self.ids = window_ids.pop(0)
-
-		for id in self.ids:
-			os.system(f"xdotool windowmove {id} 45 284")
-			os.system(f"xdotool windowsize {id} 1830 711")
-
-			with open(f"{RESOURCES_PATH}/log", "w") as f:
-				f.write(f"{app} + {id}\n")
-				f.write(f"xdotool windowmove {id} 45 284\n")
-				f.write(f"xdotool windowsize {id} 1830 711\n")
-				f.write(f"xdotool windowkill {id}\n")
+	def run_app(self, app):
+		# shows pooled app, launching it if it is not running
+		self.app = app
+		app_pool.show(app, self.app_frame)
 
-	def kill_app(self):
-		if self.ids is not None:
-			for id in self.ids:
-				os.system(f"xdotool windowkill {id}")
+	def hide_app(self):
+		if self.app is not None:
+			app_pool.hide(self.app)
 
 
 class MainAppView(UIButton):
 
 	def __init__(self, x=0, y=0, width=0, height=0, background_color: UIColor = UIColor("000000"), stroke_color: UIColor = UIColor("000000"), stroke_width=0, opacity=100):
 		super().__init__(x, y, width, height, background_color, gray_color, 1, opacity)
+		# card only changes with its notifications
+		self.rasterize = True
 		self.icon_image = UIImage(
 			x = 30,
 			y = 760  - 45 - 110,
@@ -596,9 +3641,9 @@ class MainViewController(BaseViewController):
 
 	def view_did_load(self):
 		super().view_did_load()
-		self.mail_app_view.add_target(action=self.present, event=UIEvent.press, arg=MailViewContoller())
-		self.files_app_view.add_target(action=self.present, event=UIEvent.press, arg=FilesViewController())
-		self.func_app_view.add_target(action=self.present, event=UIEvent.press, arg=FuncViewController())
+		self.mail_app_view.add_target(action=self.present, event=UIEvent.press, factory=MailViewContoller)
+		self.files_app_view.add_target(action=self.present, event=UIEvent.press, factory=FilesViewController)
+		self.func_app_view.add_target(action=self.present, event=UIEvent.press, factory=FuncViewController)
 		self.view.add_subview(self.mail_app_view)
 		self.view.add_subview(self.files_app_view)
 		self.view.add_subview(self.func_app_view)
@@ -611,222 +3656,210 @@ class MailViewContoller(AppViewContoller):
 
 	def view_did_load(self):
 		self.status_text.text += " // ЭЛ. ПОЧТА"
-		self.run_app(['thunderbird'], "Thunderbird")
 		super().view_did_load()
 
+	def view_will_appear(self):
+		super().view_will_appear()
+		self.run_app("Thunderbird")
+
 
 class FilesViewController(AppViewContoller):
 
 	def view_did_load(self):
 		self.status_text.text += " // ФАЙЛЫ"
-		self.run_app(['nautilus', "/home/parallels/"], "Home")
 		super().view_did_load()
 
+	def view_will_appear(self):
+		super().view_will_appear()
+		self.run_app("Home")
 
-class FuncViewController(AppViewContoller):
-
-	# TODO: add scroll views
-	func_button = UIButton(
-		x=45,
-		y=1080 - 284 - 115,
-		width=606,
-		height=115,
-		background_color=UIColor("E3D800"),
-		stroke_width=1,
-		stroke_color=UIColor("525252")
-	)
-
-	func_button_text = UIText(
-		x=69,
-		y=1080-305-72,
-		width=546,
-		height=72,
-		font=arisotelica_font,
-		font_size=32,
-		h_align=UIHorizonalTextAlignment.left,
-		v_align=UIVerticalTextAlignment.center,
-		text="УПРАВЛЕНИЕ ПРОЕКТОРОМ",
-		text_color=gray_color,
-		background_color=UIColor("E3D800")
-	)
-
-	tmp_block1 = UIImage(
-		x=45,
-		y=1080-404-115,
-		width=606,
-		height=115,
-		path=f"{RESOURCES_PATH}/images/tmp_block.png"
-	)
-
-	tmp_block2 = UIImage(
-		x=45,
-		y=1080-524-115,
-		width=606,
-		height=115,
-		path=f"{RESOURCES_PATH}/images/tmp_block.png"
-	)
 
-	tmp_block3 = UIImage(
-		x=45,
-		y=1080-644-115,
-		width=606,
-		height=115,
-		path=f"{RESOURCES_PATH}/images/tmp_block.png"
-	)
+class FuncViewController(AppViewContoller):
 
-	tmp_block4 = UIImage(
-		x=45,
-		y=1080-764-115,
-		width=606,
-		height=115,
-		path=f"{RESOURCES_PATH}/images/tmp_block.png"
-	)
+	def __init__(self):
+		super().__init__()
+		# names of functions, empty ones are placeholders
+		self.functions = ["УПРАВЛЕНИЕ ПРОЕКТОРОМ", "", "", "", "", ""]
+		self.selected = 0
+
+		self.scroll_bar = UIView(
+			x=659,
+			y=1080-284-712,
+			width=9,
+			height=712,
+			background_color=UIColor("ffffff")
+		)
 
-	tmp_block5 = UIImage(
-		x=45,
-		y=1080-884-115,
-		width=606,
-		height=115,
-		path=f"{RESOURCES_PATH}/images/tmp_block.png"
-	)
+		self.function_list = UIListView(
+			x=44,
+			y=1080-284-716,
+			width=608,
+			height=717,
+			count=len(self.functions),
+			row_height=115,
+			row_spacing=5,
+			make_row=self.make_function_row,
+			configure_row=self.configure_function_row,
+			content_inset=1,
+			scroll_indicator=self.scroll_bar,
+			background_color=light_gray_color
+		)
 
-	scroll_bar = UIView(
-		x=659,
-		y=1080-284-712,
-		width=9,
-		height=712,
-		background_color=UIColor("ffffff")
-	)
+		self.line_1 = UIView(
+			x=678,
+			y=1080-284-1,
+			width=1195,
+			height=1,
+			background_color=gray_color
+		)
 
-	line_1 = UIView(
-		x=678,
-		y=1080-284-1,
-		width=1195,
-		height=1,
-		background_color=gray_color
-	)
+		self.line_2 = UIView(
+			x=678,
+			y=1080-399-1,
+			width=1195,
+			height=1,
+			background_color=gray_color
+		)
 
-	line_2 = UIView(
-		x=678,
-		y=1080-399-1,
-		width=1195,
-		height=1,
-		background_color=gray_color
-	)
+		self.line_3 = UIView(
+			x=678,
+			y=1080-759-1,
+			width=1195,
+			height=1,
+			background_color=gray_color
+		)
 
-	line_3 = UIView(
-		x=678,
-		y=1080-759-1,
-		width=1195,
-		height=1,
-		background_color=gray_color
-	)
+		self.func_text = UIText(
+			x=687,
+			y=1080-306-72,
+			width=665,
+			height=72,
+			font=arisotelica_font,
+			font_size=48,
+			h_align=UIHorizonalTextAlignment.left,
+			v_align=UIVerticalTextAlignment.center,
+			text="УПРАВЛЕНИЕ ПРОЕКТОРОМ",
+			text_color=gray_color,
+			background_color=light_gray_color
+		)
 
-	func_text = UIText(
-		x=687,
-		y=1080-306-72,
-		width=665,
-		height=72,
-		font=arisotelica_font,
-		font_size=48,
-		h_align=UIHorizonalTextAlignment.left,
-		v_align=UIVerticalTextAlignment.center,
-		text="УПРАВЛЕНИЕ ПРОЕКТОРОМ",
-		text_color=gray_color,
-		background_color=light_gray_color
-	)
+		self.func_descr_text = UIText(
+			x=680,
+			y=1080-431-144,
+			width=1194,
+			height=144,
+			font=arisotelica_font,
+			font_size=24,
+			h_align=UIHorizonalTextAlignment.left,
+			v_align=UIVerticalTextAlignment.top,
+			text_color=gray_color,
+			text="В случае если проектор не включился, убедитесь, что его индикатор горит зеленым цветом. Если это не так попробуйте включить его, используя пульт.\n"
+				"После выключения проектора убедитесь, что его индикатор перестал гореть каким-либо цветом.",
+			background_color=light_gray_color,
+			wrap=True
+		)
 
-	func_descr_text = UIText(
-		x=680,
-		y=1080-431-144,
-		width=1194,
-		height=144,
-		font=arisotelica_font,
-		font_size=24,
-		h_align=UIHorizonalTextAlignment.left,
-		v_align=UIVerticalTextAlignment.top,
-		text_color=gray_color,
-		text="""
-В случае если проектор не включился, убедитесь, что его индикатор горит зеленым цветом. Если это не так попробуйте включить его, используя пульт.
-После выключения проектора убедитесь, что его индикатор перестал гореть каким-либо цветом.
-		""",
-		background_color=light_gray_color
-	)
+		self.on_button = UIButton(
+			x=840,
+			y=1080-767-115,
+			width=906,
+			height=115,
+			stroke_width=1,
+			stroke_color=gray_color,
+			background_color=light_gray_color
+		)
 
-	on_button = UIButton(
-		x=840,
-		y=1080-767-115,
-		width=906,
-		height=115,
-		stroke_width=1,
-		stroke_color=gray_color,
-		background_color=light_gray_color
-	)
+		self.on_button_text = UIText(
+			x=840,
+			y=1080-767-115,
+			width=906,
+			height=115,
+			font=arisotelica_font,
+			font_size=30,
+			h_align=UIHorizonalTextAlignment.center,
+			v_align=UIVerticalTextAlignment.center,
+			text_color=gray_color,
+			background_color=light_gray_color,
+			text="Включить проектор"
+		)
 
-	on_button_text = UIText(
-		x=840,
-		y=1080-767-115,
-		width=906,
-		height=115,
-		font=arisotelica_font,
-		font_size=30,
-		h_align=UIHorizonalTextAlignment.center,
-		v_align=UIVerticalTextAlignment.center,
-		text_color=gray_color,
-		background_color=light_gray_color,
-		text="Включить проектор"
-	)
+		self.off_button = UIButton(
+			x=840,
+			y=1080-890-115,
+			width=906,
+			height=115,
+			stroke_width=1,
+			stroke_color=gray_color,
+			background_color=light_gray_color,
+			opacity=20
+		)
 
-	off_button = UIButton(
-		x=840,
-		y=1080-890-115,
-		width=906,
-		height=115,
-		stroke_width=1,
-		stroke_color=gray_color,
-		background_color=light_gray_color,
-		opacity=20
-	)
+		self.off_button_text = UIText(
+			x=840,
+			y=1080-890-115,
+			width=906,
+			height=115,
+			font=arisotelica_font,
+			font_size=30,
+			h_align=UIHorizonalTextAlignment.center,
+			v_align=UIVerticalTextAlignment.center,
+			text_color=gray_color,
+			background_color=light_gray_color,
+			opacity=20,
+			text="Выключить проектор"
+		)
 
-	off_button_text = UIText(
-		x=840,
-		y=1080-890-115,
-		width=906,
-		height=115,
-		font=arisotelica_font,
-		font_size=30,
-		h_align=UIHorizonalTextAlignment.center,
-		v_align=UIVerticalTextAlignment.center,
-		text_color=gray_color,
-		background_color=light_gray_color,
-		opacity=20,
-		text="Выключить проектор"
-	)
+	def make_function_row(self) -> UIView:
+		row = UIButton(
+			x=0,
+			y=0,
+			width=606,
+			height=115,
+			stroke_width=1,
+			stroke_color=gray_color
+		)
+		row.add_subview(UIText(
+			x=24,
+			y=22,
+			width=546,
+			height=72,
+			font=arisotelica_font,
+			font_size=32,
+			h_align=UIHorizonalTextAlignment.left,
+			v_align=UIVerticalTextAlignment.center,
+			text_color=gray_color
+		))
+		return row
+
+	def configure_function_row(self, row: UIButton, index):
+		color = UIColor("E3D800") if index == self.selected else light_gray_color
+		row.background_color = color
+		row.subviews[0].background_color = color
+		row.subviews[0].text = self.functions[index]
+		row.add_target(self.select_function, event=UIEvent.press, arg=index)
+
+	def select_function(self, index):
+		if self.functions[index]:
+			self.selected = index
+			self.func_text.text = self.functions[index]
+			self.function_list.reload()
 
 	def turn_on(self, arg):
-		self.on_button_text.opacity = 20
-		self.on_button.opacity = 20
-		self.off_button_text.opacity = 100
-		self.off_button.opacity = 100
+		animator.tween(self.on_button_text, 0.2, opacity=20)
+		animator.tween(self.on_button, 0.2, opacity=20)
+		animator.tween(self.off_button_text, 0.2, opacity=100)
+		animator.tween(self.off_button, 0.2, opacity=100)
 
 	def turn_off(self, arg):
-		self.off_button_text.opacity = 20
-		self.off_button.opacity = 20
-		self.on_button_text.opacity = 100
-		self.on_button.opacity = 100
+		animator.tween(self.off_button_text, 0.2, opacity=20)
+		animator.tween(self.off_button, 0.2, opacity=20)
+		animator.tween(self.on_button_text, 0.2, opacity=100)
+		animator.tween(self.on_button, 0.2, opacity=100)
 
 
 	def view_did_load(self):
 		self.status_text.text += " // ФУНКЦИИ"
-		self.view.add_subview(self.func_button)
-		self.view.add_subview(self.func_button_text)
-
-		self.view.add_subview(self.tmp_block1)
-		self.view.add_subview(self.tmp_block2)
-		self.view.add_subview(self.tmp_block3)
-		self.view.add_subview(self.tmp_block4)
-		self.view.add_subview(self.tmp_block5)
-
+		self.view.add_subview(self.function_list)
 		self.view.add_subview(self.scroll_bar)
 		self.view.add_subview(self.line_1)
 		self.view.add_subview(self.line_2)
@@ -846,16 +3879,30 @@ class FuncViewController(AppViewContoller):
 		super().view_did_load()
 
 
-window = UIWindow(
-	view_controller=MainViewController,
-	width=1920,
-	height=1080,
-	title="demo"
-)
+startup_trace.add("import", startup_trace.start, time.perf_counter())
 
-application = UIApplication(
-	[window]
-)
 
-os.system("xrandr --output Virtual-1 --mode 1920x1080 --rate 60")
-application.run()
+if __name__ == "__main__":
+	if sys.argv[1:2] == ["--bundle"]:
+		# make demo packs resources next to the binary
+		UIAssetBundle.build(RESOURCES_PATH, sys.argv[2])
+		exit(0)
+
+	window = UIWindow(
+		view_controller=MainViewController,
+		width=1920,
+		height=1080,
+		title="demo",
+		transition=UITransitionStyle.slide
+	)
+
+	application = UIApplication(
+		[window]
+	)
+
+	os.system("xrandr --output Virtual-1 --mode 1920x1080 --rate 60")
+	if UI_PRELAUNCH:
+		with startup_trace.phase("apps"):
+			app_pool.prelaunch()
+	font_registry.warm()
+	application.run()